@@ -1,8 +1,15 @@
-from fastapi import FastAPI, Request, HTTPException, Depends, Query
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, HTTPException, Depends, Header, Query
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
-import core, datetime as dt, os, time as _time
+from typing import NamedTuple
+import anyio
+import core, datetime as dt, os, base64, gzip, hashlib, mimetypes, re, time as _time
+
+try:
+    import brotli
+except ImportError:     # optional: static assets are then precompressed with gzip only
+    brotli = None
 
 _APP_VERSION = str(int(_time.time()))
 import db
@@ -23,6 +30,80 @@ app.add_middleware(
 
 CurrentUser = Depends(_auth.get_current_user)
 
+# Route handlers that touch the database are plain `def`: the db helpers are
+# blocking, so FastAPI runs each such handler on its worker thread pool, capped
+# at WORKER_THREADS.  Only reading the request body needs the event loop; the
+# async dependencies below do that and hand the parsed JSON to the handler.
+# Password hashing runs on auth's own bounded pool (see auth.run_hashing).  The
+# database pool is sized from the same setting (see db.WORKER_THREADS).
+# Requests commit on threads of their own: on SQLite a request holds the write
+# lock until it commits, and worker threads may all be waiting for that lock.
+_WORKER_THREADS = db.WORKER_THREADS
+_commit_threads: anyio.CapacityLimiter | None = None
+
+
+async def _in_thread(fn, *args):
+    return await anyio.to_thread.run_sync(fn, *args)
+
+
+async def _json_body(req: Request) -> dict:
+    return await req.json()
+
+
+async def _lenient_json_body(req: Request) -> dict:
+    try:
+        return await req.json()
+    except Exception:
+        return {}
+
+
+JsonBody        = Depends(_json_body)
+LenientJsonBody = Depends(_lenient_json_body)
+
+# State token (see _state_token) of the client's copy of the training state;
+# when it is current, state-changing endpoints reply with a patch instead of
+# the state.
+StateRev = Header(None, alias="X-State-Rev")
+
+
+@app.middleware("http")
+async def _unit_of_work(request: Request, call_next):
+    """Run each /api request's database work in one unit of work — one
+    transaction, committed at the end and rolled back if the request fails
+    (see db.unit_of_work)."""
+    global _commit_threads
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    if _commit_threads is None:
+        _commit_threads = anyio.CapacityLimiter(_WORKER_THREADS)
+    response, error = None, None
+    with db.unit_of_work() as uow:
+        try:
+            response = await call_next(request)
+        except Exception as exc:
+            error = exc
+    await anyio.to_thread.run_sync(db.finish_unit_of_work, uow,
+                                   error is None and response.status_code < 400,
+                                   limiter=_commit_threads)
+    if error is not None:
+        raise error
+    return response
+
+
+@app.on_event("startup")
+async def _limit_worker_threads():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = _WORKER_THREADS
+
+
+@app.on_event("startup")
+async def _configure_hashing():
+    await _in_thread(_auth.configure_hashing)
+
+
+@app.on_event("shutdown")
+def _flush_state_cache():
+    db.flush_legacy_cache()
+
 
 # ── Per-user training state helpers ──────────────────────────────────────────
 
@@ -31,59 +112,173 @@ def _load_training(user_id: int) -> dict:
     if raw is None:
         raw = core.default_state()
         db.save_legacy(user_id, raw)
-
-    # Migrate old non-custom track keys (old system used named TEMPLATES)
-    if raw.get("track") and not raw["track"].startswith("custom_") \
-            and not raw["track"].startswith("program_"):
-        raw.pop("track", None)   # remove; calendar-based system needs no track key
-
-    # Backfill for existing users only — check workout history first
-    if raw.get("program_track") is None:
-        workouts = db.get_workouts(user_id, limit=1)
-        if workouts:
-            # Has workout history → existing user → silently assign fighter track
-            raw["program_track"] = "fighter"
-            if not raw.get("program_start_iso"):
-                raw["program_start_iso"] = _this_monday()
-            db.save_legacy(user_id, raw)
-        # else: brand-new user with no workouts → leave track+start as None → show selector
-
-    mc = raw.setdefault("microcycle", {})
-    mc.setdefault("id",                 0)
-    mc.setdefault("sessions_completed", 0)
-    mc.setdefault("start_date",         str(dt.date.today()))
-    mc.setdefault("completed",          False)
-    raw.setdefault("week_log",           {})
-    raw.setdefault("ruck_log",           [])
-    raw.setdefault("run_log",            [])
-    raw.setdefault("walk_log",           [])
-    raw.setdefault("workouts",           [])
-    raw.setdefault("custom_tracks",      [])
-    raw.setdefault("total_ruck_miles",   sum(r.get("distance_miles", 0) for r in raw["ruck_log"] if isinstance(r, dict)))
-    raw.setdefault("total_run_miles",    sum(r.get("distance_miles", 0) for r in raw["run_log"]  if isinstance(r, dict)))
-    raw.setdefault("total_walk_miles",   sum(r.get("distance_miles", 0) for r in raw["walk_log"] if isinstance(r, dict)))
-    raw.setdefault("journey_miles",
-                   raw["total_ruck_miles"] + raw["total_run_miles"] + raw["total_walk_miles"])
-
-    raw["ruck_log"] = [r for r in raw["ruck_log"] if isinstance(r, dict)]
-    raw["run_log"]  = [r for r in raw["run_log"]  if isinstance(r, dict)]
-    raw["walk_log"] = [r for r in raw["walk_log"] if isinstance(r, dict)]
+    elif raw.get("state_version", 0) < core.STATE_VERSION:
+        _upgrade_training(user_id, raw)
     return raw
 
 
+def _upgrade_training(user_id: int, raw: dict) -> bool:
+    """Bring a stored state up to core.STATE_VERSION once and persist it."""
+    upgraded = core.upgrade_state(
+        raw, has_history=lambda: bool(db.get_workouts(user_id, limit=1)))
+    if upgraded:
+        db.save_legacy(user_id, raw)
+    return upgraded
+
+
+def upgrade_all_training_states() -> int:
+    """Bulk job: upgrade every stored legacy state ahead of time so no user
+    pays for it on their first request.  Returns the number upgraded.
+
+    Run once after deploying a new state version:
+        import app; print(app.upgrade_all_training_states(), "states upgraded")
+    """
+    count = 0
+    for user_id in db.legacy_user_ids():
+        raw = db.load_legacy(user_id)
+        if raw is not None and _upgrade_training(user_id, raw):
+            count += 1
+    db.flush_legacy_cache()
+    return count
+
+
+def _state_token(rev: int, fingerprint: dict) -> str:
+    """How the client names its copy of the state (the "rev" it is sent and
+    returns in X-State-Rev): the data revision plus a digest of the state.
+    The revision alone is not enough: settings are written behind, so after a
+    crash users.rev can be ahead of the settings the database kept."""
+    return f"{rev}.{core.fingerprint_digest(fingerprint)}"
+
+
+def _state_since(user_id: int, state: dict, base_rev: str | None) -> dict | None:
+    """Fingerprint of the just-loaded state if the client holds exactly this
+    state (so a patch will apply), else None."""
+    if base_rev is None:
+        return None
+    since = core.state_fingerprint(state)
+    if base_rev != _state_token(db.get_rev(user_id), since):
+        return None
+    return since
+
+
+def _state_reply(user_id: int, state: dict, since: dict | None) -> dict:
+    """Response fields carrying the changed state: an RFC 6902 patch against
+    the client's copy when _state_since() matched, the full state otherwise."""
+    rev = _state_token(db.get_rev(user_id), core.state_fingerprint(state))
+    if since is None:
+        return {"rev": rev, "state": state}
+    return {"rev": rev, "patch": core.state_patch(since, state)}
+
+
+def _validators(request: Request, user_id: int) -> tuple[int, dict]:
+    """The user's data revision and the ETag / cache headers for a per-user
+    read.  The tag covers the revision, the path and query, the server date
+    (streaks and "today" move at midnight) and the deploy, so it can be checked
+    after reading only users.rev."""
+    rev  = db.get_rev(user_id)
+    tag  = (f"{user_id}:{rev}:{request.url.path}?{request.url.query}:"
+            f"{dt.date.today()}:{_APP_VERSION}")
+    etag = f'"{hashlib.sha256(tag.encode()).hexdigest()[:32]}"'
+    return rev, {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def _client_is_current(request: Request, etag: str) -> bool:
+    """If-None-Match matches: "*", or one of its listed tags compared weakly
+    (a W/ prefix is ignored), as RFC 9110 asks for GET."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
 def _save_training(user_id: int, d: dict) -> None:
     db.save_legacy(user_id, d)
 
 
+def _append_training(user_id: int, d: dict, log_key: str) -> None:
+    """Persist the entry core just appended to d[log_key] as a single row."""
+    db.append_legacy_entry(user_id, log_key, d[log_key][-1],
+                           week=core._week_key(dt.date.today()))
+
+
 # ── Static serving ────────────────────────────────────────────────────────────
+#
+# Every file under static/ is read once at startup and fingerprinted: it is
+# served both under its own name (revalidated by ETag) and under a content-
+# hashed name, "coin.<hash>.png", that is cached for a year as immutable.
+# Text assets have their /static/ references rewritten to the hashed names —
+# so the HTML shell, the only page that must be revalidated, points at
+# immutable URLs — and are precompressed with gzip (and brotli when the
+# module is installed).  Files up to _STATIC_INLINE_MAX bytes are kept in
+# memory; larger ones go out through FileResponse (sendfile where the server
+# supports it).
+
+_STATIC_TEXT       = {".html", ".js", ".json", ".css", ".svg", ".txt"}
+_STATIC_INLINE_MAX = 256 * 1024
+_STATIC_IMMUTABLE  = "public, max-age=31536000, immutable"
+_STATIC_REF_RE     = re.compile(rb"/static/([\w./-]+)")
+
+
+class _Asset(NamedTuple):
+    path:       Path
+    media_type: str
+    digest:     str
+    body:       bytes | None            # None: large binary file, served from disk
+    encoded:    tuple                   # ((coding, bytes), …), preferred first
+
+
+def _build_static() -> tuple[dict, set]:
+    """Assets by served name (original and hashed), and the set of hashed names."""
+    assets, hashed, urls = {}, set(), {}
+    files = [p for p in STATIC.rglob("*") if p.is_file()]
+    # Binary files first, then text that may reference them, the shell last.
+    files.sort(key=lambda p: (p.suffix in _STATIC_TEXT, p.name == "index.html", p.name))
+    for p in files:
+        name = p.relative_to(STATIC).as_posix()
+        data = p.read_bytes()
+        text = p.suffix in _STATIC_TEXT
+        encoded = ()
+        if text:
+            data = _STATIC_REF_RE.sub(
+                lambda m: b"/static/" + urls.get(m.group(1).decode(), m.group(1).decode()).encode(),
+                data)
+            encoded = tuple((coding, body) for coding, body in (
+                ("br",   brotli.compress(data) if brotli else None),
+                ("gzip", gzip.compress(data, 9)),
+            ) if body is not None and len(body) < len(data))
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, dot, suffix = name.rpartition(".")
+        urls[name] = f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+        asset = _Asset(p, mimetypes.guess_type(name)[0] or "application/octet-stream", digest,
+                       data if text or len(data) <= _STATIC_INLINE_MAX else None, encoded)
+        assets[name] = assets[urls[name]] = asset
+        hashed.add(urls[name])
+    return assets, hashed
+
+
+_STATIC_ASSETS, _STATIC_HASHED = _build_static()
+
+
+def _asset_response(request: Request, asset: _Asset, cache_control: str) -> Response:
+    """The best encoding of an asset the client accepts, or a 304 when its
+    copy of that representation is current."""
+    accept = request.headers.get("accept-encoding", "")
+    coding, body = next(((c, b) for c, b in asset.encoded if c in accept), (None, asset.body))
+    etag    = f'"{asset.digest}-{coding}"' if coding else f'"{asset.digest}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if _client_is_current(request, etag):
+        return Response(status_code=304, headers=headers)
+    if coding:
+        headers["Content-Encoding"] = coding
+    if body is None:
+        return FileResponse(asset.path, media_type=asset.media_type, headers=headers)
+    return Response(body, media_type=asset.media_type, headers=headers)
+
 
 @app.get("/", response_class=HTMLResponse)
-def index():
-    resp = FileResponse(STATIC / "index.html")
-    resp.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    resp.headers["Pragma"]        = "no-cache"
-    resp.headers["Expires"]       = "0"
-    return resp
+def index(request: Request):
+    return _asset_response(request, _STATIC_ASSETS["index.html"], "no-cache")
 
 @app.get("/service-worker.js")
 def service_worker_root():
@@ -94,17 +289,19 @@ def service_worker_root():
     return resp
 
 @app.get("/static/{path:path}")
-def statics(path: str):
-    fp = STATIC / path
-    if not fp.exists():
+def statics(path: str, request: Request):
+    asset = _STATIC_ASSETS.get(path)
+    if asset is None:
         raise HTTPException(404)
-    resp = FileResponse(fp)
-    resp.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    return resp
+    return _asset_response(request, asset,
+                           _STATIC_IMMUTABLE if path in _STATIC_HASHED else "no-cache")
 
 @app.get("/health")
-def health():
-    return {"status": "ok", "version": _APP_VERSION}
+async def health():
+    return {"status": "ok", "version": _APP_VERSION,
+            "state_cache": db.legacy_cache_stats(), "writes": db.write_stats(),
+            "token_cache": _auth.token_cache_stats(),
+            "unit_of_work": db.unit_of_work_stats()}
 
 @app.get("/api/version")
 def api_version():
@@ -114,8 +311,7 @@ def api_version():
 # ── Auth ──────────────────────────────────────────────────────────────────────
 
 @app.post("/register")
-async def register(req: Request):
-    p        = await req.json()
+async def register(p: dict = JsonBody):
     username = (p.get("username") or "").strip()
     password = (p.get("password") or "").strip()
     if not username or not password:
@@ -124,10 +320,11 @@ async def register(req: Request):
         raise HTTPException(400, "Username must be at least 3 characters")
     if len(password) < 6:
         raise HTTPException(400, "Password must be at least 6 characters")
-    if db.get_user_by_username(username):
+    if await _in_thread(db.get_user_by_username, username):
         raise HTTPException(409, "Username already taken")
+    password_hash = await _auth.run_hashing(_auth.hash_password, password)
     try:
-        user_id = db.create_user(username, _auth.hash_password(password))
+        user_id = await _in_thread(db.create_user, username, password_hash)
     except ValueError:
         raise HTTPException(409, "Username already taken")
     token = _auth.create_token(user_id, username)
@@ -135,15 +332,20 @@ async def register(req: Request):
 
 
 @app.post("/login")
-async def login(req: Request):
-    p        = await req.json()
+async def login(p: dict = JsonBody):
     username = (p.get("username") or "").strip()
     password = (p.get("password") or "").strip()
     if not username or not password:
         raise HTTPException(400, "username and password are required")
-    user = db.get_user_by_username(username)
-    if not user or not _auth.verify_password(password, user["password_hash"]):
+    user = await _in_thread(db.get_user_by_username, username)
+    if not user:
+        raise HTTPException(401, "Invalid username or password")
+    ok, new_hash = await _auth.run_hashing(_auth.verify_and_update,
+                                           password, user["password_hash"])
+    if not ok:
         raise HTTPException(401, "Invalid username or password")
+    if new_hash:
+        await _in_thread(db.set_password_hash, user["id"], new_hash)
     token = _auth.create_token(user["id"], user["username"])
     return {"status": "ok", "token": token, "username": user["username"]}
 
@@ -151,49 +353,106 @@ async def login(req: Request):
 # ── Training state ────────────────────────────────────────────────────────────
 
 @app.get("/api/state")
-def get_state(u: dict = CurrentUser):
+def get_state(request: Request, response: Response, u: dict = CurrentUser):
+    _, headers = _validators(request, u["user_id"])
+    if _client_is_current(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return _load_training(u["user_id"])
 
 @app.get("/api/workout/today")
-def get_today(date: str | None = Query(None), u: dict = CurrentUser):
-    state    = _load_training(u["user_id"])
+def get_today(request: Request, response: Response, date: str | None = Query(None),
+              u: dict = CurrentUser):
+    _, headers = _validators(request, u["user_id"])
+    if _client_is_current(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    workout = _today_workout(u["user_id"], _load_training(u["user_id"]), date)
+    if isinstance(workout, bytes):
+        return Response(workout, media_type="application/json", headers=headers)
+    response.headers.update(headers)
+    return workout
+
+def _today_workout(user_id: int, state: dict, date: str | None) -> bytes | dict:
+    """Today's workout for a loaded state: program days come back as the
+    pre-serialised catalog payload, everything else as a dict."""
     for_date = None
     if date:
         try:
             for_date = dt.date.fromisoformat(date)
         except ValueError:
             pass
-    workout = core.get_today_workout(state, for_date=for_date)
-    # Augment suggested_weight from db history if available
+    workout = core.get_today_entry(state, for_date=for_date)
+    if isinstance(workout, core.CatalogEntry):
+        # Program day: catalog payload plus the user's suggested_weight from
+        # db history if available
+        weight = db.get_latest_weight(user_id)
+        return core.workout_json(workout, **({"suggested_weight": float(weight)} if weight else {}))
     if workout.get("status") == "active":
-        history = db.get_workouts(u["user_id"], limit=50)
-        for row in history:
-            if row.get("weight_kg") and row.get("type") in ("recommended", "strength"):
-                workout["suggested_weight"] = float(row["weight_kg"])
-                break
+        weight = db.get_latest_weight(user_id)
+        if weight:
+            workout["suggested_weight"] = float(weight)
     return workout
 
+@app.get("/api/bootstrap")
+def bootstrap(request: Request, date: str | None = Query(None), u: dict = CurrentUser):
+    """Everything the app loads at start — state, today's workout, streak,
+    movements and the first page of workouts — from one state load, in one
+    response.  A warm client revalidates to a 304 (see _validators)."""
+    uid          = u["user_id"]
+    today        = dt.date.today()
+    rev, headers = _validators(request, uid)
+    if _client_is_current(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    state        = _load_training(uid)
+    # Loading can save (a new user, a state upgrade) and move the revision.
+    rev, headers = _validators(request, uid)
+    workout      = _today_workout(uid, state, date)
+    streak       = core.streak_info(today, **db.get_streak(uid, today, core.WK_TARGET))
+    # Catalog and movement payloads are already encoded; splice them in as-is.
+    parts = {
+        "rev":       core._dumps(_state_token(rev, core.state_fingerprint(state))),
+        "state":     core._dumps(state),
+        "today":     workout if isinstance(workout, bytes) else core._dumps(workout),
+        "streak":    core._dumps(streak),
+        "movements": core.MOVEMENTS_JSON,
+        "workouts":  core._dumps(_workouts_page(uid, 50, None, rev)),
+    }
+    body = b"{" + b",".join(b'"%s":%s' % (k.encode(), v) for k, v in parts.items()) + b"}"
+    return Response(body, media_type="application/json", headers=headers)
+
 @app.get("/api/movements")
-def get_movements():
-    return core.get_movements()
+async def get_movements(request: Request):
+    """The movement catalog, pre-encoded at import.  Clients revalidate with
+    If-None-Match and get a bodiless 304 while the catalog is unchanged."""
+    headers = {"ETag": core.MOVEMENTS_ETAG, "Cache-Control": "public, max-age=86400"}
+    if _client_is_current(request, core.MOVEMENTS_ETAG):
+        return Response(status_code=304, headers=headers)
+    return Response(core.MOVEMENTS_JSON, media_type="application/json", headers=headers)
+
+def _latest_for(user_id: int, slugs: list) -> dict:
+    """Latest sets/reps/kg per slug.  Old rows may carry the display name
+    instead of the slug; the newer of the two wins."""
+    names  = core.MOVEMENT_NAMES
+    latest = db.get_movement_latest(user_id, slugs + [names[s] for s in slugs if s in names])
+    out = {}
+    for slug in slugs:
+        rows = [r for r in (latest.get(slug), latest.get(names.get(slug))) if r]
+        row  = max(rows, key=lambda r: (r["date"], r["workout_id"]), default=None)
+        out[slug] = ({"movement": slug, "weight_kg": row["weight_kg"], "sets": row["sets"],
+                      "reps": row["reps"], "date": row["date"]} if row else
+                     {"movement": slug, "weight_kg": None, "sets": None, "reps": None})
+    return out
+
+@app.get("/api/movement_history")
+def get_movement_history_batch(slugs: str = Query(..., max_length=4000),
+                               u: dict = CurrentUser):
+    """Latest numbers for a comma-separated list of movement slugs, in one call."""
+    wanted = list(dict.fromkeys(s.strip() for s in slugs.split(",") if s.strip()))[:100]
+    return {"movements": _latest_for(u["user_id"], wanted)}
 
 @app.get("/api/movement_history/{movement}")
 def get_movement_history(movement: str, u: dict = CurrentUser):
-    workouts = db.get_workouts(u["user_id"], limit=200)
-    # Build display-name fallback for old entries stored with names instead of slugs
-    slug_to_name = {m["slug"]: m["name"] for m in core.get_movements()}
-    display_name = slug_to_name.get(movement)
-    for w in workouts:
-        wm = w.get("movement")
-        if (wm == movement or (display_name and wm == display_name)) and w.get("sets") and w.get("reps"):
-            return {
-                "movement":  movement,
-                "weight_kg": w.get("weight_kg"),
-                "sets":      w["sets"],
-                "reps":      w["reps"],
-                "date":      w["date"],
-            }
-    return {"movement": movement, "weight_kg": None, "sets": None, "reps": None}
+    return _latest_for(u["user_id"], [movement])[movement]
 
 @app.get("/api/tracks")
 def get_tracks(u: dict = CurrentUser):
@@ -219,11 +478,12 @@ def get_track_detail(key: str, u: dict = CurrentUser):
     return detail
 
 @app.post("/api/track/select")
-async def select_track(req: Request, u: dict = CurrentUser):
-    payload = await req.json()
+def select_track(payload: dict = JsonBody, u: dict = CurrentUser,
+                 base_rev: str | None = StateRev):
     key     = payload.get("key", "").strip()
     uid     = u["user_id"]
     state   = _load_training(uid)
+    since   = _state_since(uid, state, base_rev)
     if key.startswith("custom_"):
         track_id = key[7:]
         if core.get_custom_track_detail(state, track_id) is None:
@@ -232,12 +492,11 @@ async def select_track(req: Request, u: dict = CurrentUser):
         raise HTTPException(400, f"Unknown track: {key}")
     msg = core.init_track(state, key)
     _save_training(uid, state)
-    return {"status": "ok", "msg": msg, "state": state}
+    return {"status": "ok", "msg": msg, **_state_reply(uid, state, since)}
 
 
 @app.post("/api/track/select-program")
-async def select_program_track(req: Request, u: dict = CurrentUser):
-    p     = await req.json()
+def select_program_track(p: dict = JsonBody, u: dict = CurrentUser):
     track = p.get("program_track", "fighter")
     if track not in ("fighter", "kyle"):
         raise HTTPException(400, "Unknown program track")
@@ -265,11 +524,6 @@ def restart_program(u: dict = CurrentUser):
 
 # ── Date helpers ─────────────────────────────────────────────────────────────
 
-def _this_monday() -> str:
-    today  = dt.date.today()
-    monday = today - dt.timedelta(days=today.weekday())
-    return str(monday)
-
 def _next_monday() -> str:
     """Return this Monday if today IS Monday, otherwise next Monday."""
     today = dt.date.today()
@@ -294,50 +548,110 @@ def _local_today(p: dict) -> str:
     return str(dt.date.today())
 
 
-# ── Workout logging ───────────────────────────────────────────────────────────
-
-@app.post("/api/workout/recommended")
-async def log_recommended(req: Request, u: dict = CurrentUser):
-    try:
-        p = await req.json()
-    except Exception:
-        p = {}
-    weights_lbs = p.get("weights_lbs")
-    uid   = u["user_id"]
-    state = _load_training(uid)
-    msg   = core.log_rec(state, weights_lbs=weights_lbs)
-    _save_training(uid, state)
-    today        = _local_today(p)
-    duration_min = None
+def _duration_min(p: dict) -> float | None:
+    """Convert the optional duration_seconds field of a request body to minutes."""
     try:
         raw_secs = p.get("duration_seconds")
         if raw_secs:
-            duration_min = round(float(raw_secs) / 60, 1) or None
+            return round(float(raw_secs) / 60, 1) or None
     except (TypeError, ValueError):
         pass
+    return None
+
+
+def _encode_cursor(date: str, row_id: int) -> str:
+    """Opaque keyset cursor for the (date, id) ordering of history pages."""
+    return base64.urlsafe_b64encode(f"{date}|{row_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str | None) -> tuple[str, int] | None:
+    if not cursor:
+        return None
+    try:
+        raw       = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, rid = raw.rsplit("|", 1)
+        return date, int(rid)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+# ── Workout logging ───────────────────────────────────────────────────────────
+
+@app.post("/api/workout/recommended")
+def log_recommended(p: dict = LenientJsonBody, u: dict = CurrentUser,
+                    base_rev: str | None = StateRev):
+    weights_lbs = p.get("weights_lbs")
+    uid    = u["user_id"]
+    state  = _load_training(uid)
+    since  = _state_since(uid, state, base_rev)
+    before = len(state["workouts"])
+    msg    = core.log_rec(state, weights_lbs=weights_lbs)
+    if len(state["workouts"]) > before:
+        _save_training(uid, state)
+        _append_training(uid, state, "workouts")
+    today        = _local_today(p)
+    duration_min = _duration_min(p)
     if state.get("workouts"):
         last = state["workouts"][-1]
         db.insert_workout(uid, today, "recommended", 0,
                           notes=last.get("details", "")[:200],
                           duration_min=duration_min)
-    return {"status": "ok", "msg": msg, "state": state}
+    return {"status": "ok", "msg": msg, **_state_reply(uid, state, since)}
+
+@app.post("/api/workout/session")
+def log_full_session(p: dict = JsonBody, u: dict = CurrentUser,
+                     base_rev: str | None = StateRev):
+    """Log a completed recommended session and all of its exercise rows in one
+    request and one commit (replaces /api/workout/recommended followed by one
+    /api/strength call per exercise)."""
+    exercises = []
+    for ex in p.get("exercises") or []:
+        movement = (ex.get("movement") or "").strip()
+        if not movement:
+            continue
+        try:
+            exercises.append({
+                "movement":  movement,
+                "weight_kg": float(ex.get("weight_kg") or 0),
+                "sets":      max(1, int(ex.get("sets") or 1)),
+                "reps":      max(1, int(ex.get("reps") or 1)),
+            })
+        except (TypeError, ValueError):
+            raise HTTPException(400, f"Invalid numbers for {movement}")
+    uid    = u["user_id"]
+    state  = _load_training(uid)
+    since  = _state_since(uid, state, base_rev)
+    before = len(state["workouts"])
+    msg    = core.log_rec(state, weights_lbs=p.get("weights_lbs"))
+    entry  = state["workouts"][-1] if len(state["workouts"]) > before else None
+    session_id = db.record_session(
+        uid, _local_today(p), entry, week=core._week_key(dt.date.today()),
+        exercises=exercises,
+        notes=entry.get("details", "")[:200] if entry else None,
+        duration_min=_duration_min(p),
+        state=state if entry is not None else None,
+    )
+    return {"status": "ok", "msg": msg, "session_id": session_id,
+            "exercises_logged": len(exercises), **_state_reply(uid, state, since)}
 
 @app.post("/api/workout/custom")
-async def log_custom(req: Request, u: dict = CurrentUser):
-    payload = await req.json()
+def log_custom(payload: dict = JsonBody, u: dict = CurrentUser,
+               base_rev: str | None = StateRev):
     text    = payload.get("text", "").strip()
     if not text:
         raise HTTPException(400, "Empty workout description")
     uid   = u["user_id"]
     state = _load_training(uid)
+    since = _state_since(uid, state, base_rev)
     msg   = core.log_custom(state, text)
     _save_training(uid, state)
+    _append_training(uid, state, "workouts")
     db.insert_workout(uid, _local_today(payload), "custom", 0, notes=text[:200])
-    return {"status": "ok", "msg": msg, "state": state}
+    return {"status": "ok", "msg": msg, "movements": core.find_movements(text),
+            **_state_reply(uid, state, since)}
 
 @app.post("/api/ruck")
-async def log_ruck(req: Request, u: dict = CurrentUser):
-    p = await req.json()
+def log_ruck(p: dict = JsonBody, u: dict = CurrentUser, base_rev: str | None = StateRev):
     try:
         miles  = float(p["miles"])
         pounds = float(p.get("pounds", 0) or 0)
@@ -347,16 +661,16 @@ async def log_ruck(req: Request, u: dict = CurrentUser):
         raise HTTPException(400, "miles must be positive")
     uid   = u["user_id"]
     state = _load_training(uid)
+    since = _state_since(uid, state, base_rev)
     msg   = core.log_ruck(state, miles, pounds, today_str=_local_today(p))
-    _save_training(uid, state)
+    _append_training(uid, state, "ruck_log")
     db.insert_workout(uid, _local_today(p), "rucking", 0,
                       distance_miles=miles, weight_lbs=pounds or None,
                       duration_min=float(p.get("duration_min") or 0) or None)
-    return {"status": "ok", "msg": msg, "state": state}
+    return {"status": "ok", "msg": msg, **_state_reply(uid, state, since)}
 
 @app.post("/api/walk")
-async def log_walk(req: Request, u: dict = CurrentUser):
-    p = await req.json()
+def log_walk(p: dict = JsonBody, u: dict = CurrentUser, base_rev: str | None = StateRev):
     try:
         miles = float(p["miles"])
     except (KeyError, ValueError):
@@ -365,16 +679,16 @@ async def log_walk(req: Request, u: dict = CurrentUser):
         raise HTTPException(400, "miles must be positive")
     uid   = u["user_id"]
     state = _load_training(uid)
+    since = _state_since(uid, state, base_rev)
     msg   = core.log_walk(state, miles, today_str=_local_today(p))
-    _save_training(uid, state)
+    _append_training(uid, state, "walk_log")
     db.insert_workout(uid, _local_today(p), "walking", 0,
                       distance_miles=miles,
                       duration_min=float(p.get("duration_min") or 0) or None)
-    return {"status": "ok", "msg": msg, "state": state}
+    return {"status": "ok", "msg": msg, **_state_reply(uid, state, since)}
 
 @app.post("/api/run")
-async def log_run(req: Request, u: dict = CurrentUser):
-    p = await req.json()
+def log_run(p: dict = JsonBody, u: dict = CurrentUser, base_rev: str | None = StateRev):
     try:
         miles = float(p["miles"])
     except (KeyError, ValueError):
@@ -389,16 +703,16 @@ async def log_run(req: Request, u: dict = CurrentUser):
             pace = None
     uid   = u["user_id"]
     state = _load_training(uid)
+    since = _state_since(uid, state, base_rev)
     msg   = core.log_run(state, miles, pace, today_str=_local_today(p))
-    _save_training(uid, state)
+    _append_training(uid, state, "run_log")
     db.insert_workout(uid, _local_today(p), "running", 0,
                       distance_miles=miles,
                       duration_min=float(p.get("duration_min") or 0) or None)
-    return {"status": "ok", "msg": msg, "state": state}
+    return {"status": "ok", "msg": msg, **_state_reply(uid, state, since)}
 
 @app.post("/api/strength")
-async def log_strength(req: Request, u: dict = CurrentUser):
-    p          = await req.json()
+def log_strength(p: dict = JsonBody, u: dict = CurrentUser):
     movement   = (p.get("movement") or "").strip()
     weight_kg  = float(p.get("weight_kg") or 0)
     sets_n     = int(p.get("sets") or 1)
@@ -412,62 +726,87 @@ async def log_strength(req: Request, u: dict = CurrentUser):
     db.insert_workout(uid, today, "strength", 0,
                       movement=movement, weight_kg=weight_kg,
                       sets=sets_n, reps=reps_n)
-    move_name = next((m["name"] for m in core.get_movements() if m["slug"] == movement),
-                     movement.replace("_", " ").title())
+    move_name = core.MOVEMENT_NAMES.get(movement, movement.replace("_", " ").title())
     return {
         "status": "ok",
         "msg":    f"{move_name} — {sets_n}×{reps_n} @ {weight_kg}kg logged",
     }
 
 @app.post("/api/session")
-async def log_session(req: Request, u: dict = CurrentUser):
-    p          = await req.json()
+def log_session(p: dict = JsonBody, u: dict = CurrentUser, base_rev: str | None = StateRev):
     session_type = (p.get("type") or "custom").strip()
     notes        = (p.get("notes") or "").strip()
     uid          = u["user_id"]
     state        = _load_training(uid)
+    since        = _state_since(uid, state, base_rev)
     msg          = core.log_custom(state, notes or session_type)
     _save_training(uid, state)
-    duration_min = None
-    try:
-        raw_secs = p.get("duration_seconds")
-        if raw_secs:
-            duration_min = round(float(raw_secs) / 60, 1) or None
-    except (TypeError, ValueError):
-        pass
+    _append_training(uid, state, "workouts")
+    duration_min = _duration_min(p)
     db.insert_workout(uid, _local_today(p), session_type, 0,
                       notes=notes[:200] if notes else None,
                       duration_min=duration_min)
-    return {"status": "ok", "msg": msg, "state": state}
+    return {"status": "ok", "msg": msg, "movements": core.find_movements(notes),
+            **_state_reply(uid, state, since)}
 
 
 # ── Workout history CRUD ──────────────────────────────────────────────────────
 
 @app.get("/api/workouts")
-def get_workouts_list(u: dict = CurrentUser):
-    return {"workouts": db.get_workouts(u["user_id"])}
+def get_workouts_list(request: Request, response: Response,
+                      limit: int = Query(50, ge=1, le=200), cursor: str | None = Query(None),
+                      u: dict = CurrentUser):
+    """Workout history, newest first, one keyset page at a time.  Pass the
+    returned next_cursor back as ?cursor= for the following page."""
+    rev, headers = _validators(request, u["user_id"])
+    if _client_is_current(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return _workouts_page(u["user_id"], limit, cursor, rev)
+
+def _workouts_page(user_id: int, limit: int, cursor: str | None, rev: int) -> dict:
+    rows     = db.get_workouts(user_id, limit=limit + 1, before=_decode_cursor(cursor))
+    has_more = len(rows) > limit
+    rows     = rows[:limit]
+    return {
+        "workouts":    rows,
+        "version":     rev,
+        "has_more":    has_more,
+        "next_cursor": _encode_cursor(rows[-1]["date"], rows[-1]["id"]) if has_more else None,
+    }
 
 @app.get("/api/sessions")
-def get_sessions(u: dict = CurrentUser):
-    return {"sessions": db.get_workouts(u["user_id"], limit=50)}
+def get_sessions(limit: int = Query(20, ge=1, le=100), cursor: str | None = Query(None),
+                 u: dict = CurrentUser):
+    """Completed sessions with their exercises nested, newest first.  Pass the
+    returned next_cursor back as ?cursor= for the following page."""
+    rows     = db.get_sessions(u["user_id"], limit=limit + 1, before=_decode_cursor(cursor))
+    has_more = len(rows) > limit
+    rows     = rows[:limit]
+    return {
+        "sessions":    rows,
+        "has_more":    has_more,
+        "next_cursor": _encode_cursor(rows[-1]["date"], rows[-1]["id"]) if has_more else None,
+    }
 
 @app.put("/api/workout/{workout_id}")
-async def edit_workout(workout_id: int, req: Request, u: dict = CurrentUser):
-    p   = await req.json()
+def edit_workout(workout_id: int, p: dict = JsonBody, u: dict = CurrentUser):
+    """Update one workout row.  Responds with just that row and the new data
+    version; the client patches its local list instead of refetching it."""
     uid = u["user_id"]
-    old_rows = db.get_workouts(uid, limit=500)
-    old = next((r for r in old_rows if r["id"] == workout_id), None)
-    if not old:
-        raise HTTPException(404, "Workout not found")
     update_fields = {}
     for field in ("movement", "weight_kg", "sets", "reps",
                   "distance_miles", "duration_min", "weight_lbs", "notes"):
         if field in p:
             update_fields[field] = p[field]
-    ok = db.update_workout(workout_id, uid, **update_fields)
-    if not ok:
+    if not update_fields:
+        if db.get_workout(workout_id, uid) is None:
+            raise HTTPException(404, "Workout not found")
         raise HTTPException(404, "Workout not found or no changes")
-    return {"status": "ok", "workouts": db.get_workouts(uid)}
+    row = db.update_workout(workout_id, uid, **update_fields)
+    if not row:
+        raise HTTPException(404, "Workout not found")
+    return {"status": "ok", "workout": row, "version": db.get_rev(uid)}
 
 @app.delete("/api/workout/{workout_id}")
 def del_workout(workout_id: int, u: dict = CurrentUser):
@@ -475,14 +814,14 @@ def del_workout(workout_id: int, u: dict = CurrentUser):
     deleted = db.delete_workout(workout_id, uid)
     if not deleted:
         raise HTTPException(404, "Workout not found")
-    return {"status": "ok", "workouts": db.get_workouts(uid)}
+    return {"status": "ok", "deleted": deleted["id"], "version": db.get_rev(uid)}
 
 
 # ── Custom tracks ─────────────────────────────────────────────────────────────
 
 @app.post("/api/tracks/custom")
-async def save_custom_track(req: Request, u: dict = CurrentUser):
-    p        = await req.json()
+def save_custom_track(p: dict = JsonBody, u: dict = CurrentUser,
+                      base_rev: str | None = StateRev):
     name     = (p.get("name") or "").strip()
     sessions = p.get("sessions", [])
     if not name:
@@ -491,38 +830,50 @@ async def save_custom_track(req: Request, u: dict = CurrentUser):
         raise HTTPException(400, "At least one session is required.")
     uid   = u["user_id"]
     state = _load_training(uid)
+    since = _state_since(uid, state, base_rev)
     try:
         track = core.save_custom_track(state, name, sessions)
     except ValueError as e:
         raise HTTPException(400, str(e))
     _save_training(uid, state)
-    return {"status": "ok", "track": track, "state": state}
+    return {"status": "ok", "track": track, **_state_reply(uid, state, since)}
 
 @app.delete("/api/tracks/custom/{track_id}")
-def delete_custom_track(track_id: str, u: dict = CurrentUser):
+def delete_custom_track(track_id: str, u: dict = CurrentUser, base_rev: str | None = StateRev):
     uid   = u["user_id"]
     state = _load_training(uid)
+    since = _state_since(uid, state, base_rev)
     found = core.delete_custom_track(state, track_id)
     if not found:
         raise HTTPException(404, f"Custom track not found: {track_id}")
     _save_training(uid, state)
-    return {"status": "ok", "state": state}
+    return {"status": "ok", **_state_reply(uid, state, since)}
 
 
 # ── New analytics endpoints ───────────────────────────────────────────────────
 
 @app.get("/api/streak")
-def get_streak(u: dict = CurrentUser):
-    state = _load_training(u["user_id"])
-    return core.get_streak_info(state)
+def get_streak(request: Request, response: Response, u: dict = CurrentUser):
+    """Weekly streak from the per-week active-day index (no history scan)."""
+    _, headers = _validators(request, u["user_id"])
+    if _client_is_current(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    today = dt.date.today()
+    return core.streak_info(today, **db.get_streak(u["user_id"], today, core.WK_TARGET))
+
+@app.get("/api/summary")
+def get_summary(u: dict = CurrentUser):
+    """Journey mileage, session/activity counts and this week's activity count,
+    served from the materialised summary row without loading any history."""
+    return db.get_summary(u["user_id"], week=core._week_key(dt.date.today()))
 
 @app.get("/api/progress/{movement}")
 def get_progress(movement: str, u: dict = CurrentUser):
     history = db.get_movement_history_all(u["user_id"], movement, limit=20)
     # Fallback: if no results by slug, try matching stored display name
     if not history:
-        slug_to_name = {m["slug"]: m["name"] for m in core.get_movements()}
-        display_name = slug_to_name.get(movement)
+        display_name = core.MOVEMENT_NAMES.get(movement)
         if display_name:
             history = db.get_movement_history_all(u["user_id"], display_name, limit=20)
     return {"movement": movement, "history": history}
@@ -1,11 +1,27 @@
 """
 Authentication helpers for Olympus Training Log.
-- bcrypt password hashing via passlib
+- bcrypt password hashing via passlib, on a bounded pool with a calibrated cost
 - JWT token issuance / verification via python-jose
+
+Env vars:
+  HASH_THREADS        Concurrent bcrypt operations (default 4).
+  HASH_QUEUE_TIMEOUT  Seconds a request waits for a hashing slot before
+                      getting 503 (default 5).
+  HASH_TARGET_MS      Target time for one hash; the bcrypt cost is calibrated
+                      to it at startup (default 250).
+  BCRYPT_ROUNDS       Fixed bcrypt cost; skips calibration when set.
+  TOKEN_CACHE_SIZE    Verified JWTs kept in memory (default 1024; 0 disables).
 """
+import math
 import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
+import anyio
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException
@@ -15,6 +31,14 @@ SECRET_KEY       = os.environ.get("SECRET_KEY", "olympus-dev-secret-CHANGE-IN-PR
 ALGORITHM        = "HS256"
 TOKEN_EXPIRE_DAYS = 30
 
+HASH_THREADS       = int(os.environ.get("HASH_THREADS", "4"))
+HASH_QUEUE_TIMEOUT = float(os.environ.get("HASH_QUEUE_TIMEOUT", "5"))
+HASH_TARGET_MS     = float(os.environ.get("HASH_TARGET_MS", "250"))
+TOKEN_CACHE_SIZE   = int(os.environ.get("TOKEN_CACHE_SIZE", "1024"))
+_MIN_ROUNDS, _MAX_ROUNDS = 10, 16
+
+log = logging.getLogger(__name__)
+
 pwd_context    = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme  = HTTPBearer(auto_error=False)
 
@@ -27,6 +51,63 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+def verify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """Verify a password; on success also return a fresh hash when the stored
+    one was made with an outdated cost (None when it is current)."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+# ── Hashing cost calibration ──────────────────────────────────────────────────
+
+def calibrate_bcrypt_rounds(target_ms: float = HASH_TARGET_MS) -> int:
+    """Largest bcrypt cost whose hash time stays within target_ms on this
+    machine, clamped to [10, 16].  Each extra round doubles the time, so one
+    cheap timing at cost 8 is enough to extrapolate."""
+    probe = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=8)
+    probe.hash("calibration")                           # load the backend
+    elapsed = min(_timed(probe.hash, "calibration") for _ in range(3))
+    rounds  = 8 + math.floor(math.log2(max(target_ms / 1000 / elapsed, 1)))
+    return max(_MIN_ROUNDS, min(_MAX_ROUNDS, rounds))
+
+
+def _timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def configure_hashing() -> int:
+    """Set the bcrypt cost for new hashes (BCRYPT_ROUNDS, or calibrated to
+    HASH_TARGET_MS).  Stored hashes below it are flagged by needs_update and
+    re-hashed on the user's next successful login."""
+    rounds = int(os.environ.get("BCRYPT_ROUNDS") or calibrate_bcrypt_rounds())
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+    log.info("bcrypt cost set to %d", rounds)
+    return rounds
+
+
+# ── Bounded hashing pool ──────────────────────────────────────────────────────
+#
+# bcrypt is deliberately CPU-heavy.  At most HASH_THREADS hashes run at once, on
+# their own threads, so a burst of logins cannot starve the rest of the API.
+# Requests wait for a slot on the event loop (no thread held) and give up with
+# 503 after HASH_QUEUE_TIMEOUT seconds rather than piling up.
+
+_hash_limiter: anyio.CapacityLimiter | None = None
+
+
+async def run_hashing(fn, *args):
+    """Run a blocking password-hash function on the hashing pool."""
+    global _hash_limiter
+    if _hash_limiter is None:
+        _hash_limiter = anyio.CapacityLimiter(HASH_THREADS)
+    # The deadline only bounds the wait for a slot: run_sync shields the hash
+    # once it has one, so a hash that has started always finishes.
+    with anyio.move_on_after(HASH_QUEUE_TIMEOUT):
+        return await anyio.to_thread.run_sync(fn, *args, limiter=_hash_limiter)
+    raise HTTPException(503, "Server busy, please retry", headers={"Retry-After": "1"})
+
+
 def create_token(user_id: int, username: str) -> str:
     expire = datetime.utcnow() + timedelta(days=TOKEN_EXPIRE_DAYS)
     return jwt.encode(
@@ -36,14 +117,60 @@ def create_token(user_id: int, username: str) -> str:
     )
 
 
+# ── Verified-token cache ──────────────────────────────────────────────────────
+#
+# LRU of tokens that passed full verification, keyed by a SHA-256 digest of the
+# token string, holding the decoded user and the token's exp.  A hit skips the
+# HMAC check and claim parsing; entries are dropped once exp has passed.
+
+_token_cache: "OrderedDict[bytes, tuple[dict, float]]" = OrderedDict()
+_token_lock  = threading.Lock()
+_token_stats = {"hits": 0, "misses": 0}
+
+
+def _cached_user(key: bytes) -> dict | None:
+    with _token_lock:
+        entry = _token_cache.get(key)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del _token_cache[key]
+            _token_stats["misses"] += 1
+            return None
+        _token_cache.move_to_end(key)
+        _token_stats["hits"] += 1
+        return dict(entry[0])
+
+
+def _cache_user(key: bytes, user: dict, exp: float) -> None:
+    with _token_lock:
+        _token_cache[key] = (user, exp)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
+def token_cache_stats() -> dict:
+    with _token_lock:
+        return {**_token_stats, "size": len(_token_cache)}
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
 ) -> dict:
     """FastAPI dependency — validates JWT and returns {user_id, username}."""
     if credentials is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    token = credentials.credentials
+    key   = hashlib.sha256(token.encode()).digest() if TOKEN_CACHE_SIZE > 0 else None
+    if key is not None:
+        user = _cached_user(key)
+        if user is not None:
+            return user
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        return {"user_id": int(payload["sub"]), "username": payload["username"]}
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user    = {"user_id": int(payload["sub"]), "username": payload["username"]}
     except (JWTError, KeyError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if key is not None and "exp" in payload:
+        _cache_user(key, user, float(payload["exp"]))
+    return dict(user)
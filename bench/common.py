@@ -0,0 +1,59 @@
+"""
+Shared set-up for the benchmark scripts in bench/.
+
+Each script runs against a throwaway SQLite file so it never touches a real
+database.  Call use_temp_db() before importing db or app — both read their
+configuration from the environment at import.
+
+    python bench/get_sessions.py
+"""
+import logging, os, sys, tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def use_temp_db(**env: str) -> Path:
+    """Point DB_PATH at a fresh file, apply `env`, and make the app importable."""
+    path = Path(tempfile.mkdtemp(prefix="firstbell-bench-")) / "bench.db"
+    os.environ.pop("DATABASE_URL", None)
+    os.environ.update({"DB_PATH": str(path), **env})
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    logging.disable(logging.WARNING)
+    return path
+
+
+def seed_three_year_user(client, weeks: int = 156) -> dict:
+    """Register a user on a TestClient and give them `weeks` of history — four
+    program sessions and three cardio logs a week, ~1100 log entries for three
+    years — written through db as the endpoints would.  Returns auth headers."""
+    import datetime as dt, random
+    import app, core, db
+
+    token = client.post("/register", json={"username": "veteran",
+                                           "password": "secret1"}).json()["token"]
+    headers = {"Authorization": "Bearer " + token}
+    client.post("/api/track/select", json={"key": "program_1"}, headers=headers)
+    user_id = db.get_user_by_username("veteran")["id"]
+    state   = app._load_training(user_id)
+    week    = core._week_key(dt.date.today())
+    start   = dt.date.today() - dt.timedelta(weeks=weeks)
+    rng     = random.Random(3)
+    for day in range(weeks * 7):
+        date = str(start + dt.timedelta(days=day))
+        if day % 7 in (0, 1, 3, 4):
+            core.log_rec(state, weights_lbs={"main": 35.3})
+            state["workouts"][-1]["date"] = date
+            log_key = "workouts"
+        else:
+            log_key = rng.choice(["ruck_log", "run_log", "walk_log"])
+            if log_key == "ruck_log":
+                core.log_ruck(state, 3.0, 30, today_str=date)
+            elif log_key == "run_log":
+                core.log_run(state, 3.1, 9.5, today_str=date)
+            else:
+                core.log_walk(state, 2.0, today_str=date)
+        db.append_legacy_entry(user_id, log_key, state[log_key][-1], week=week)
+    db.flush_legacy_cache()
+    return headers
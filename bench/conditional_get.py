@@ -0,0 +1,63 @@
+"""
+Latency of the per-user read endpoints answered in full (200) against a
+revalidation with If-None-Match (empty 304), for a user with three years of
+history.  Also checks that a write makes the old ETag miss.  Exits non-zero
+when a matching tag does not get an empty 304, or a stale one does.
+
+    python bench/conditional_get.py [--requests 300]
+    LEGACY_CACHE_SIZE=0 python bench/conditional_get.py     # cache off
+"""
+import argparse, datetime as dt, sys, time
+
+import common
+
+
+def per_request_ms(fn, n: int) -> float:
+    fn()                                            # warm up
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e3
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--requests", type=int, default=300, help="requests per measurement")
+    args = ap.parse_args()
+
+    common.use_temp_db()
+    from fastapi.testclient import TestClient
+    import app
+
+    client  = TestClient(app.app)
+    headers = common.seed_three_year_user(client)
+    today   = str(dt.date.today())
+    paths   = ["/api/state", "/api/streak", "/api/workouts",
+               f"/api/workout/today?date={today}", f"/api/bootstrap?date={today}"]
+
+    print(f"{'endpoint':22s} {'200 ms':>8s} {'body':>10s} {'304 ms':>8s}")
+    ok, tags = True, {}
+    for path in paths:
+        first = client.get(path, headers=headers)
+        tags[path] = first.headers["etag"]
+        cond = {**headers, "If-None-Match": tags[path]}
+        again = client.get(path, headers=cond)
+        if again.status_code != 304 or again.content:
+            print(f"{path}: matching ETag got {again.status_code} with "
+                  f"{len(again.content)} B")
+            ok = False
+        full = per_request_ms(lambda: client.get(path, headers=headers), args.requests)
+        hit  = per_request_ms(lambda: client.get(path, headers=cond), args.requests)
+        print(f"{path.split('?')[0]:22s} {full:8.2f} {len(first.content):>8,d} B {hit:8.2f}")
+
+    client.post("/api/walk", json={"miles": 1}, headers=headers)
+    stale = {p: client.get(p, headers={**headers, "If-None-Match": tags[p]}).status_code
+             for p in paths}
+    print(f"\nafter a write, old ETags get: {sorted(set(stale.values()))}")
+    ok &= all(code == 200 for code in stale.values())
+    if not ok:
+        sys.exit("conditional GET check failed")
+
+
+if __name__ == "__main__":
+    main()
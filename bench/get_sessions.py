@@ -0,0 +1,72 @@
+"""
+Query count and latency of db.get_sessions() against the per-session loop it
+replaced, for users with 50, 500 and 5,000 sessions (six workouts rows each:
+the session summary plus five exercises).  Every page fetches all sessions.
+
+    python bench/get_sessions.py [--sizes 50 500 5000] [--runs 5]
+"""
+import argparse, time
+
+import common
+
+common.use_temp_db(LEGACY_CACHE_SIZE="0")
+
+import db
+from sqlalchemy import event, text
+
+_queries = [0]
+event.listen(db.engine, "before_cursor_execute",
+             lambda *_: _queries.__setitem__(0, _queries[0] + 1))
+
+
+def n_plus_one_sessions(user_id: int, limit: int = 50) -> list:
+    """The pre-change get_sessions(): one exercise query per session row."""
+    with db._db() as sess:
+        sessions = [dict(r._mapping) for r in sess.execute(
+            text("SELECT * FROM workout_sessions WHERE user_id = :uid "
+                 "ORDER BY date DESC, id DESC LIMIT :limit"),
+            {"uid": user_id, "limit": limit},
+        )]
+        for sd in sessions:
+            sd["exercises"] = [dict(r._mapping) for r in sess.execute(
+                text("SELECT * FROM workouts WHERE session_id = :sid ORDER BY id ASC"),
+                {"sid": sd["id"]},
+            )]
+        return sessions
+
+
+def seed(user_id: int, sessions: int) -> None:
+    exercises = [{"movement": "kb_swing", "weight_kg": 16, "sets": 5, "reps": 10}] * 5
+    for _ in range(sessions):
+        db.record_session(user_id, "2024-01-01",
+                          {"date": "2024-01-01", "type": "recommended", "details": "bench"},
+                          "2024-01", exercises)
+
+
+def measure(fn, user_id: int, limit: int, runs: int) -> tuple[int, float]:
+    """(queries per call, mean ms per call) after one warm-up call."""
+    fn(user_id, limit=limit)
+    _queries[0] = 0
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        fn(user_id, limit=limit)
+    return _queries[0] // runs, (time.perf_counter() - t0) / runs * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    ap.add_argument("--runs",  type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'sessions':>8}   {'N+1 queries / ms':>20}   {'IN (...) queries / ms':>21}")
+    for n in args.sizes:
+        user_id = db.create_user(f"bench_{n}", "x")
+        seed(user_id, n)
+        old_q, old_ms = measure(n_plus_one_sessions, user_id, n, args.runs)
+        new_q, new_ms = measure(db.get_sessions,     user_id, n, args.runs)
+        print(f"{n:>8,}   {old_q:>8,} / {old_ms:>9,.1f}   {new_q:>9,} / {new_ms:>9,.1f}")
+
+
+if __name__ == "__main__":
+    main()
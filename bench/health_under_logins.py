@@ -0,0 +1,84 @@
+"""
+/health and /api/state latency while 50 logins hash passwords at once.
+
+Drives the app in process over httpx.ASGITransport: /health is probed alone
+for a second, then again (with /api/state) during a burst of concurrent
+logins.  bcrypt runs on its own bounded pool and the handlers on the worker
+pool, so neither probe should queue behind the burst.  Exits non-zero when
+/health's p50 or worst case during the burst exceeds the limits.
+
+    python bench/health_under_logins.py [--logins 50] [--p50-ms 50] [--max-ms 1000]
+"""
+import argparse, asyncio, statistics, sys, time
+
+import common
+
+# Let every login wait for a hashing slot, so the burst lasts until all are done.
+common.use_temp_db(HASH_QUEUE_TIMEOUT="120")
+
+import httpx
+import app as _app
+
+USER = {"username": "burst_user", "password": "burst-secret"}
+
+
+async def _probe(client, path: str, out: list, stop: asyncio.Event, headers=None) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get(path, headers=headers)
+        out.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.01)
+
+
+def _summary(ms: list) -> str:
+    return f"p50 {statistics.median(ms):7.1f} ms   max {max(ms):7.1f} ms   ({len(ms)} probes)"
+
+
+async def run(logins: int) -> tuple[list, list, list]:
+    await _app._configure_hashing()
+    await _app._limit_worker_threads()
+    transport = httpx.ASGITransport(app=_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 timeout=120) as client:
+        token = (await client.post("/register", json=USER)).json()["token"]
+        auth  = {"Authorization": f"Bearer {token}"}
+
+        idle, stop = [], asyncio.Event()
+        task = asyncio.create_task(_probe(client, "/health", idle, stop))
+        await asyncio.sleep(1)
+        stop.set()
+        await task
+
+        health, state, stop = [], [], asyncio.Event()
+        probes = [asyncio.create_task(_probe(client, "/health", health, stop)),
+                  asyncio.create_task(_probe(client, "/api/state", state, stop, auth))]
+        t0 = time.perf_counter()
+        replies = await asyncio.gather(*(client.post("/login", json=USER)
+                                         for _ in range(logins)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await asyncio.gather(*probes)
+    ok = sum(r.status_code == 200 for r in replies)
+    print(f"{logins} logins: {ok} ok, {logins - ok} rejected, {elapsed:.2f} s")
+    return idle, health, state
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--logins", type=int,   default=50)
+    ap.add_argument("--p50-ms", type=float, default=50,   help="limit for /health p50")
+    ap.add_argument("--max-ms", type=float, default=1000, help="limit for the slowest /health")
+    args = ap.parse_args()
+
+    idle, health, state = asyncio.run(run(args.logins))
+    print(f"/health idle          {_summary(idle)}")
+    print(f"/health during burst  {_summary(health)}")
+    print(f"/api/state during     {_summary(state)}")
+    if statistics.median(health) > args.p50_ms or max(health) > args.max_ms:
+        sys.exit(f"FAIL: /health latency under load exceeds "
+                 f"p50 {args.p50_ms:g} ms / max {args.max_ms:g} ms")
+    print("ok: /health latency stays flat")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Precision and recall of core.resolve_movement() against the hand-labelled
+set in movement_labels.json: every movement label parse_prescription() finds
+in the track programs and the arms rotation, mapped to its catalog slug or to
+null when the catalog has no such movement.  Exits non-zero below either
+threshold, or when a catalog line yields a label the set does not cover yet.
+
+    python bench/movement_resolver.py [--precision 1.0] [--recall 1.0]
+"""
+import argparse, json, sys, time
+from pathlib import Path
+
+import common
+
+sys.path.insert(0, str(common.ROOT))
+
+import core
+
+LABELS = Path(__file__).with_name("movement_labels.json")
+
+
+def catalog_lines() -> set:
+    lines = set()
+
+    def walk(v):
+        if isinstance(v, str):
+            lines.add(v)
+        elif isinstance(v, dict):
+            for x in v.values():
+                walk(x)
+        elif isinstance(v, (list, tuple)):
+            for x in v:
+                walk(x)
+
+    for track in ("fighter", "kyle"):
+        walk(core.TRACK_PROGRAMS[track])
+    walk(core.ARMS_ROTATION)
+    return lines
+
+
+def score(records: list, labels: dict) -> dict:
+    """Counts per record: a wrong slug is both a false positive and a miss."""
+    n = {"tp": 0, "fp": 0, "wrong": 0, "fn": 0, "tn": 0}
+    for r in records:
+        want, got = labels[r["movement"]], r["slug"]
+        if got and got == want:
+            n["tp"] += 1
+        elif got and want:
+            n["wrong"] += 1
+            print(f"  wrong: {r['movement']!r} -> {got}, expected {want}")
+        elif got:
+            n["fp"] += 1
+            print(f"  false positive: {r['movement']!r} -> {got}")
+        elif want:
+            n["fn"] += 1
+            print(f"  missed: {r['movement']!r}, expected {want}")
+        else:
+            n["tn"] += 1
+    found, expected = n["tp"] + n["fp"] + n["wrong"], n["tp"] + n["fn"] + n["wrong"]
+    n["precision"] = n["tp"] / found if found else 1.0
+    n["recall"]    = n["tp"] / expected if expected else 1.0
+    return n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--precision", type=float, default=1.0, help="minimum precision")
+    ap.add_argument("--recall",    type=float, default=1.0, help="minimum recall")
+    args = ap.parse_args()
+
+    labels  = json.loads(LABELS.read_text())
+    lines   = catalog_lines()
+    records = [r for line in lines for r in core.parse_prescription(line)]
+    missing = sorted({r["movement"] for r in records} - labels.keys())
+    if missing:
+        sys.exit(f"unlabelled movements, add them to {LABELS.name}: {missing}")
+
+    n = score(records, labels)
+    print(f"{len(lines)} lines, {len(records)} records: tp={n['tp']} fp={n['fp']} "
+          f"wrong={n['wrong']} fn={n['fn']} tn={n['tn']}")
+    print(f"precision {n['precision']:.3f}, recall {n['recall']:.3f}")
+
+    t0 = time.perf_counter()
+    for line in lines:
+        core.resolve_movement(line)
+    print(f"resolve_movement: {(time.perf_counter() - t0) / len(lines) * 1e6:.1f} us per line")
+
+    if n["precision"] < args.precision or n["recall"] < args.recall:
+        sys.exit(f"below threshold (precision >= {args.precision}, recall >= {args.recall})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Write throughput of the SQLite profiles: THREADS threads each log WRITES
+cardio entries through db.append_legacy_entry() on a fresh file, once under
+SQLITE_PROFILE=dev and once under production.  The profile is read at import,
+so each run is a separate process.
+
+    python bench/sqlite_writes.py [--threads 16] [--writes 150]
+"""
+import argparse, subprocess, sys, threading, time
+
+import common
+
+
+def run(threads: int, writes: int) -> None:
+    import db
+
+    errors: list = []
+    users = [db.create_user(f"writer_{i}", "x") for i in range(threads)]
+    entry = {"date": "2024-01-01", "distance_miles": 1.0, "weight_lbs": 30}
+
+    def work(user_id: int) -> None:
+        for _ in range(writes):
+            try:
+                db.append_legacy_entry(user_id, "ruck_log", dict(entry), week="2024-01")
+            except Exception as exc:
+                errors.append(type(exc).__name__)
+
+    workers = [threading.Thread(target=work, args=(u,)) for u in users]
+    t0 = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    done    = threads * writes - len(errors)
+    stats   = db.write_stats()
+    print(f"{db._SQLITE_PROFILE:>10}: {done / elapsed:7.0f} writes/s   "
+          f"{done} writes in {elapsed:.2f} s, {len(errors)} errors {sorted(set(errors))}"
+          + (f", {stats['jobs']} jobs in {stats['batches']} commits" if stats["writer"] else ""))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--writes",  type=int, default=150, help="writes per thread")
+    ap.add_argument("--profile", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.profile:
+        common.use_temp_db(SQLITE_PROFILE=args.profile)
+        run(args.threads, args.writes)
+        return
+    for profile in ("dev", "production"):
+        subprocess.run([sys.executable, __file__, "--profile", profile,
+                        "--threads", str(args.threads), "--writes", str(args.writes)],
+                       check=True)
+
+
+if __name__ == "__main__":
+    main()
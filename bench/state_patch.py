@@ -0,0 +1,89 @@
+"""
+Response size of each state-changing endpoint with and without X-State-Rev,
+for a user with three years of history.  Every patch is applied to the
+client's copy of the state and compared with a fresh GET /api/state; a stale
+state token, or the current revision with another state's digest, must fall
+back to the full state.  Exits non-zero on any mismatch.
+
+    python bench/state_patch.py
+"""
+import argparse, copy, json, sys
+
+import common
+
+CALLS = [
+    ("/api/walk",               {"miles": 1.5}),
+    ("/api/run",                {"miles": 3, "pace_min_per_mile": 9}),
+    ("/api/ruck",               {"miles": 2, "pounds": 30}),
+    ("/api/workout/custom",     {"text": "KB swings and push-ups"}),
+    ("/api/session",            {"type": "mobility", "notes": "stretch"}),
+    ("/api/workout/recommended", {}),
+    ("/api/workout/session",    {"exercises": [{"movement": "kb_swing", "weight_kg": 20,
+                                                "sets": 5, "reps": 10}]}),
+    ("/api/tracks/custom",      {"name": "Mine", "sessions": [{"main": "KB Swing 5x10"}]}),
+    ("/api/track/select",       {"key": "program_2"}),
+]
+
+
+def apply_patch(doc: dict, ops: list) -> dict:
+    """The subset of RFC 6902 the server emits: top-level add/replace/remove
+    and appends to a list ("/<key>/-")."""
+    for op in ops:
+        key, *rest = [p.replace("~1", "/").replace("~0", "~")
+                      for p in op["path"][1:].split("/")]
+        if op["op"] == "remove":
+            doc.pop(key)
+        elif rest == ["-"]:
+            doc.setdefault(key, []).append(op["value"])
+        else:
+            doc[key] = op["value"]
+    return doc
+
+
+def _same(a: dict, b: dict) -> bool:
+    return json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+
+
+def main() -> None:
+    argparse.ArgumentParser(description=__doc__.strip().splitlines()[0]).parse_args()
+    common.use_temp_db()
+    from fastapi.testclient import TestClient
+    import app, core
+
+    client  = TestClient(app.app)
+    headers = common.seed_three_year_user(client)
+    state   = client.get("/api/state", headers=headers).json()
+    print(f"history: {sum(len(state[k]) for k in core._APPEND_ONLY_LOGS)} log entries\n")
+    print(f"{'endpoint':26s} {'full':>10s} {'patch':>8s}  ops  applied == state")
+
+    ok = True
+    for path, body in CALLS:
+        plain = client.post(path, json=body, headers=headers)
+        full  = plain.json()
+        delta = client.post(path, json=body,
+                            headers={**headers, "X-State-Rev": str(full["rev"])})
+        reply = delta.json()
+        if "patch" not in reply:
+            print(f"{path:26s} no patch in reply: {sorted(reply)}")
+            ok = False
+            continue
+        mine  = apply_patch(copy.deepcopy(full["state"]), reply["patch"])
+        same  = _same(mine, client.get("/api/state", headers=headers).json())
+        ok   &= same
+        print(f"{path:26s} {len(plain.content):>8,d} B {len(delta.content):>6,d} B"
+              f"  {len(reply['patch']):>3d}  {same}")
+
+    old      = client.get("/api/bootstrap", headers=headers).json()["rev"]
+    current  = client.post("/api/walk", json={"miles": 1}, headers=headers).json()["rev"]
+    fallback = True
+    for token in (old, current.split(".")[0] + "." + old.split(".")[1]):
+        reply = client.post("/api/walk", json={"miles": 1},
+                            headers={**headers, "X-State-Rev": token}).json()
+        fallback &= "state" in reply and "patch" not in reply
+    print(f"\nstale X-State-Rev falls back to the full state: {fallback}")
+    if not (ok and fallback):
+        sys.exit("patch check failed")
+
+
+if __name__ == "__main__":
+    main()
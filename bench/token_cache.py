@@ -0,0 +1,63 @@
+"""
+Cost of auth.get_current_user() per request with and without the verified-
+token cache: N calls spread over a handful of tokens.  Also confirms that a
+cached token is rejected with 401 once its exp has passed.
+
+    python bench/token_cache.py [--calls 50000] [--tokens 5]
+"""
+import argparse, sys, time
+
+import common
+
+sys.path.insert(0, str(common.ROOT))
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+import auth
+
+
+def _bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def per_request_us(creds: list, calls: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(calls):
+        auth.get_current_user(creds[i % len(creds)])
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def expired_token_rejected() -> bool:
+    token = jwt.encode({"sub": "1", "username": "expiring", "exp": time.time() + 1},
+                       auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+    auth.get_current_user(_bearer(token))           # verified and cached
+    time.sleep(2.1)
+    try:
+        auth.get_current_user(_bearer(token))
+    except HTTPException as exc:
+        return exc.status_code == 401
+    return False
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--calls",  type=int, default=50_000)
+    ap.add_argument("--tokens", type=int, default=5)
+    args = ap.parse_args()
+
+    creds = [_bearer(auth.create_token(i, f"user{i}")) for i in range(args.tokens)]
+    size  = auth.TOKEN_CACHE_SIZE or 1024
+    for label, cache_size in (("no cache", 0), ("cache", size)):
+        auth.TOKEN_CACHE_SIZE = cache_size
+        auth._token_cache.clear()
+        auth._token_stats.update(hits=0, misses=0)
+        us = per_request_us(creds, args.calls)
+        print(f"{label:>8}: {us:6.1f} us/request   {auth.token_cache_stats()}")
+    if not expired_token_rejected():
+        sys.exit("FAIL: an expired token was served from the cache")
+    print("ok: expired cached token rejected with 401")
+
+
+if __name__ == "__main__":
+    main()
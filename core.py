@@ -4,8 +4,15 @@ Pure Python, no I/O. Stateless functions that operate on state dicts.
 """
 
 import datetime as dt
+import hashlib
+import json
 import re
 import time
+from collections import deque
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
 
 # ── 12-Week Program Data ──────────────────────────────────────────────────────
 
@@ -2585,19 +2592,163 @@ _MOVEMENT_TABLE = [
 ]
 
 
+# Read-only slug → movement record, built once.
+MOVEMENTS = MappingProxyType({
+    s: MappingProxyType({"slug": s, "name": n, "category": c, "std_kg": kg, "hint": h})
+    for s, n, c, kg, h in _MOVEMENT_TABLE
+})
+MOVEMENT_NAMES = MappingProxyType({s: m["name"] for s, m in MOVEMENTS.items()})
+
+
 def get_movements() -> list:
-    return [
-        {"slug": s, "name": n, "category": c, "std_kg": kg, "hint": h}
-        for s, n, c, kg, h in _MOVEMENT_TABLE
-    ]
+    return [dict(m) for m in MOVEMENTS.values()]
+
+
+# ── Movement resolver ─────────────────────────────────────────────────────────
+#
+# Maps free text ("SUPERSET A1 — Two-Hand KB Swing 5×15 @ 16 kg", "did some
+# farmer's carries") to a movement slug.  Every table name plus the aliases
+# below is normalised (lowercase, punctuation → space, trailing plural "s"
+# folded, space-padded so matches stop at word boundaries) and compiled once
+# into an Aho–Corasick automaton, so a label is resolved in one pass however
+# many phrases there are.  The longest phrase wins: "Double KB Swing" beats
+# "KB Swing", "Clean + Press" beats "Clean".
+
+_MOVEMENT_ALIASES = {
+    "Swing":                     "kb_swing",
+    "Hip Thrust":                "kb_hip_thrust",
+    "Clean + Press":             "kb_clean_press",
+    "Clean + Z Press":           "kb_clean_press",
+    "Single-Arm Press":          "kb_press",
+    "Overhead Press":            "kb_press",
+    "Z Press":                   "kb_press",
+    "Push Press":                "kb_push_press",
+    "Long Cycle":                "kb_long_cycle",
+    "Floor Press":               "kb_floor_press",
+    "Overhead Tricep Extension": "kb_oh_tricep_ext",
+    "Overhead Tricep Ext":       "kb_oh_tricep_ext",
+    "Tricep Kickback":           "kb_tricep_kickback",
+    "Hammer Curl":               "kb_hammer_curl",
+    "Zottman Curl":              "kb_zottman_curl",
+    "Front Squat":               "kb_front_squat",
+    "Lateral Lunge":             "kb_lateral_lunge",
+    "Side Lunge":                "kb_lateral_lunge",
+    "Curtsy Lunge":              "kb_curtsy_lunge",
+    "Reverse Lunge":             "kb_reverse_lunge",
+    "Step-Up":                   "kb_step_up",
+    "Deadlift":                  "kb_deadlift",
+    "Single-Leg Deadlift":       "kb_sl_rdl",
+    "Single-Leg KB Deadlift":    "kb_sl_rdl",
+    "Get-Up":                    "kb_tgu",
+    "Windmill":                  "kb_windmill",
+    "Arm Bar":                   "kb_arm_bar",
+    "KB Row":                    "kb_row",
+    "Bent-Over Row":             "kb_row",
+    "Chest-Supported Row":       "kb_chest_supported_row",
+    "Farmer Walk":               "kb_farmer_carry",
+    "Waiter Carry":              "kb_oh_carry",
+    "Pushup":                    "bw_push_up",
+    "Press-Up":                  "bw_push_up",
+    "Split Squat":               "bw_bulgarian",
+    "Nordic Curl":               "bw_nordic_curl",
+    "Hip Bridge":                "bw_hip_bridge",
+    "Clamshell":                 "bw_clamshell",
+    "Band Walk":                 "bw_lateral_band_walk",
+    "Ab Wheel":                  "bw_ab_wheel",
+    "Face Pull":                 "bw_face_pull",
+}
+
+_LABEL_WORD_RE = re.compile(r"[a-z0-9+]+")
+
+
+def _label_key(text: str) -> str:
+    """Normalised, space-padded form of a label used for phrase matching."""
+    words = []
+    for w in _LABEL_WORD_RE.findall((text or "").lower().replace("'", "").replace("’", "")):
+        if len(w) > 4 and w.endswith("ies"):
+            w = w[:-3] + "y"
+        elif len(w) > 2 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        words.append(w)
+    return " " + " ".join(words) + " "
+
+
+def _build_matcher(phrases: dict) -> tuple:
+    """Aho–Corasick automaton as (goto, fail, out) lists indexed by state;
+    out[state] holds (length, slug) for every phrase ending there."""
+    goto, fail, out = [{}], [0], [()]
+    for key, slug in phrases.items():
+        state = 0
+        for ch in key:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = goto[state][ch] = len(goto)
+                goto.append({})
+                fail.append(0)
+                out.append(())
+            state = nxt
+        out[state] = ((len(key), slug),)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for ch, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f].get(ch, 0)
+            out[nxt] += out[fail[nxt]]
+    return goto, fail, out
+
+
+_MATCHER = _build_matcher({
+    **{_label_key(name): slug for slug, name, *_ in _MOVEMENT_TABLE},
+    **{_label_key(alias): slug for alias, slug in _MOVEMENT_ALIASES.items()},
+})
+
+
+def _phrase_matches(key: str) -> list:
+    """(start, end, slug) for every phrase occurring in a normalised key."""
+    goto, fail, out = _MATCHER
+    state, found = 0, []
+    for i, ch in enumerate(key):
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        for length, slug in out[state]:
+            found.append((i + 1 - length, i + 1, slug))
+    return found
+
+
+def resolve_movement(text: str) -> str | None:
+    """Slug of the longest movement phrase in text (leftmost on ties), or None."""
+    best = max(_phrase_matches(_label_key(text)),
+               key=lambda m: (m[1] - m[0], -m[0]), default=None)
+    return best[2] if best else None
+
+
+def find_movements(text: str) -> list:
+    """Distinct slugs mentioned in free text, in order of appearance.  Matches
+    are taken leftmost-longest and never overlap."""
+    found, end = [], 0
+    for start, stop, slug in sorted(_phrase_matches(_label_key(text)),
+                                    key=lambda m: (m[0], m[0] - m[1])):
+        # Neighbouring phrases share the padding space between them.
+        if start + 1 >= end:
+            found.append(slug)
+            end = stop
+    return list(dict.fromkeys(found))
 
 
 # ── Default state ─────────────────────────────────────────────────────────────
 
 def default_state() -> dict:
     return {
+        "state_version":      STATE_VERSION,
         "program_start_iso":  None,    # set when user picks a track
         "program_track":      None,    # None = new user, show selector
+        "microcycle":         {"id": 0, "sessions_completed": 0,
+                               "start_date": str(dt.date.today()), "completed": False},
         "workouts":           [],
         "ruck_log":           [],
         "run_log":            [],
@@ -2611,6 +2762,109 @@ def default_state() -> dict:
     }
 
 
+# ── State schema upgrades ─────────────────────────────────────────────────────
+#
+# Stored legacy documents carry a "state_version".  Each upgrade brings a
+# document from the previous version to its own; the caller runs the pending
+# ones once and persists the result, so reads never repeat the work.
+# Each entry is a dict with:
+#   version  : int  — the version this upgrade brings the state to
+#   describe : str  — human-readable description
+#   apply    : callable(state, has_history) — mutates state in place;
+#              has_history() reports whether the user has any logged workouts
+
+def _upgrade_defaults(state: dict, has_history) -> None:
+    # Old non-custom track keys came from the named TEMPLATES system; the
+    # calendar-based programs need no track key.
+    track = state.get("track")
+    if track and not track.startswith("custom_") and not track.startswith("program_"):
+        state.pop("track", None)
+    mc = state.setdefault("microcycle", {})
+    mc.setdefault("id",                 0)
+    mc.setdefault("sessions_completed", 0)
+    mc.setdefault("start_date",         str(dt.date.today()))
+    mc.setdefault("completed",          False)
+    state.setdefault("custom_tracks", [])
+
+
+def _upgrade_program_track(state: dict, has_history) -> None:
+    # Users from before the track selector: if they already have workout
+    # history, silently put them on the fighter track.  Brand-new users keep
+    # track + start as None so the selector is shown.
+    if state.get("program_track") is None and has_history():
+        today = dt.date.today()
+        state["program_track"] = "fighter"
+        if not state.get("program_start_iso"):
+            state["program_start_iso"] = str(today - dt.timedelta(days=today.weekday()))
+
+
+STATE_UPGRADES = [
+    {"version": 1, "describe": "Drop template track keys, default microcycle",
+     "apply": _upgrade_defaults},
+    {"version": 2, "describe": "Backfill program_track for users with history",
+     "apply": _upgrade_program_track},
+]
+STATE_VERSION = STATE_UPGRADES[-1]["version"]
+
+
+def upgrade_state(state: dict, has_history=lambda: False) -> bool:
+    """Run every pending upgrade on state in version order.  Returns True if
+    the state was upgraded and needs saving."""
+    current = state.get("state_version", 0)
+    pending = [u for u in STATE_UPGRADES if u["version"] > current]
+    for u in pending:
+        u["apply"](state, has_history)
+        state["state_version"] = u["version"]
+    return bool(pending)
+
+
+# ── State deltas ──────────────────────────────────────────────────────────────
+#
+# Mutation endpoints can answer with an RFC 6902 patch instead of the whole
+# state.  state_fingerprint() is taken before the change and state_patch()
+# diffs the changed state against it.  The activity logs only ever grow, so
+# they are fingerprinted by length and new entries become "add …/-" ops; every
+# other top-level key is small and is replaced whole when its JSON changes.
+
+_APPEND_ONLY_LOGS = ("workouts", "ruck_log", "run_log", "walk_log")
+_MISSING          = object()
+
+
+def _fingerprint_value(key: str, value):
+    if key in _APPEND_ONLY_LOGS and isinstance(value, list):
+        return len(value)
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def state_fingerprint(state: dict) -> dict:
+    return {k: _fingerprint_value(k, v) for k, v in state.items()}
+
+
+def fingerprint_digest(fingerprint: dict) -> str:
+    """Short digest of a state_fingerprint(): states with equal digests take
+    the same patches."""
+    blob = json.dumps(fingerprint, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def state_patch(before: dict, state: dict) -> list:
+    """JSON Patch ops taking the fingerprinted state to `state`."""
+    ops = []
+    for key, value in state.items():
+        path = "/" + key.replace("~", "~0").replace("/", "~1")
+        old  = before.get(key, _MISSING)
+        if old is _MISSING:
+            ops.append({"op": "add", "path": path, "value": value})
+        elif (key in _APPEND_ONLY_LOGS and isinstance(value, list)
+              and isinstance(old, int) and old <= len(value)):
+            ops.extend({"op": "add", "path": f"{path}/-", "value": v} for v in value[old:])
+        elif old != _fingerprint_value(key, value):
+            ops.append({"op": "replace", "path": path, "value": value})
+    for key in before.keys() - state.keys():
+        ops.append({"op": "remove", "path": "/" + key.replace("~", "~0").replace("/", "~1")})
+    return ops
+
+
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
 def _get_custom_track(state: dict, track_key: str) -> dict | None:
@@ -2656,9 +2910,12 @@ def _get_program_and_week(state: dict, today: dt.date | None = None) -> tuple:
     return program_idx, current_week, weeks_elapsed
 
 
+_KG_RE = re.compile(r'@\s*(\d+(?:\.\d+)?)\s*kg')
+
+
 def _parse_std_kg(main_text: str, default: float = 16.0) -> float:
     """Extract first '@ N kg' weight from a string; returns default when absent."""
-    m = re.search(r'@\s*(\d+(?:\.\d+)?)\s*kg', main_text or "")
+    m = _KG_RE.search(main_text or "")
     return float(m.group(1)) if m else default
 
 
@@ -2666,88 +2923,125 @@ def _first_kg(strings: list) -> float | None:
     """Return the weight (kg) from the first item in a list that contains '@ N kg'.
     Returns None when no item has an explicit weight."""
     for s in (strings or []):
-        m = re.search(r'@\s*(\d+(?:\.\d+)?)\s*kg', s or "")
+        m = _KG_RE.search(s or "")
         if m:
             return float(m.group(1))
     return None
 
 
-# ── Public API ────────────────────────────────────────────────────────────────
+# ── Prescription parser ───────────────────────────────────────────────────────
+#
+# Turns a prescription line such as
+#   "SUPERSET A1 — Goblet Squat 3×10 @ 16 kg  — Elbows pry knees apart…  [LEGS]"
+# into exercise records:
+#   {"movement": "Goblet Squat", "slug": "kb_goblet_squat", "sets": 3, "reps": 10,
+#    "reps_max": None, "unit": "reps", "per_side": False, "kg": 16.0,
+#    "superset": "A1", "tag": "LEGS"}
+# "SUPERSET — Row 3×10/side @ 12 kg / Hammer Curl 3×12 @ 8 kg" yields two
+# records (superset "S1", "S2").  Lines with no N×M prescription yield none.
+# Each movement name is resolved to its slug (None when not in the movement
+# table).  Results are cached per distinct line, so each is parsed once.
+
+_SUPERSET_RE = re.compile(r'^SUPERSET\s*([A-Z]\d)?\s*—\s*')
+_TAG_RE      = re.compile(r'\[([A-Z][A-Z/&+\- ]*?)(?:\s*—[^\]]*)?\]')
+_NOTE_RE     = re.compile(r'\s+—\s|\s{2,}\(|\s\[')
+_SPLIT_RE    = re.compile(r'\s/\s(?=[^×/]*\d\s*×)')
+_EXERCISE_RE = re.compile(
+    r'^(?P<name>.+?)\s+(?P<sets>\d+)\s*×\s*(?P<reps>\d+)(?:\s*[–-]\s*(?P<reps_max>\d+))?'
+    r'\s*(?P<unit>s|sec|min|m|steps)?\b(?P<side>\s*/\s*(?:side|leg|hand|arm))?'
+)
+_EXERCISE_KG_RE = re.compile(r'@\s*(?:RIGHT:\s*)?(\d+(?:\.\d+)?)\s*kg')
+_UNITS = {"s": "s", "sec": "s", "min": "min", "m": "m", "steps": "steps"}
+
+
+@lru_cache(maxsize=4096)
+def parse_prescription(line: str) -> tuple:
+    """Exercise records (read-only) for one prescription line."""
+    text  = (line or "").strip()
+    tag_m = _TAG_RE.search(text)
+    tag   = tag_m.group(1).strip() if tag_m else None
+    ss_m  = _SUPERSET_RE.match(text)
+    group = None
+    if ss_m:
+        group = ss_m.group(1) or "S"
+        text  = text[ss_m.end():]
+    head     = _NOTE_RE.split(text, maxsplit=1)[0] if group != "S" else text
+    segments = _SPLIT_RE.split(head) if group == "S" else [head]
+    records  = []
+    for seg in segments:
+        if group == "S":
+            seg = _NOTE_RE.split(seg, maxsplit=1)[0]
+        m = _EXERCISE_RE.match(seg.strip())
+        if not m and group != "S":
+            # "Calf Raise — straight-leg 2×15 …": the name itself has a dash
+            seg = text.split("  ")[0]
+            m   = _EXERCISE_RE.match(seg.strip())
+        if not m:
+            continue
+        kg_m = _EXERCISE_KG_RE.search(seg, m.end())
+        name = m.group("name").strip()
+        records.append(MappingProxyType({
+            "movement": name,
+            "slug":     resolve_movement(name),
+            "sets":     int(m.group("sets")),
+            "reps":     int(m.group("reps")),
+            "reps_max": int(m.group("reps_max")) if m.group("reps_max") else None,
+            "unit":     _UNITS.get(m.group("unit") or "", "reps"),
+            "per_side": bool(m.group("side")),
+            "kg":       float(kg_m.group(1)) if kg_m else None,
+            "superset": (f"S{len(records) + 1}" if group == "S" else group),
+            "tag":      tag,
+        }))
+    return tuple(records)
+
+
+# Payload fields holding prescription text, in display order.
+_PRESCRIPTION_SECTIONS = ("main", "full_body_block", "focus_work", "arms", "finisher",
+                          "mobility_block", "pre_session", "rehab", "stretch")
+
+
+def _exercise_records(payload: dict) -> list:
+    """Flat list of parsed exercises for a workout payload, each tagged with the
+    section and line index it came from."""
+    out = []
+    for section in _PRESCRIPTION_SECTIONS:
+        lines = payload.get(section)
+        if isinstance(lines, str):
+            lines = [lines]
+        for idx, line in enumerate(lines or []):
+            if not isinstance(line, str):
+                continue
+            for rec in parse_prescription(line):
+                out.append({"section": section, "line": idx, **rec})
+    return out
 
-def get_today_workout(state: dict, for_date: dt.date | None = None) -> dict:
-    today        = for_date or dt.date.today()
-    dow          = today.weekday()          # 0=Mon … 6=Sun
-    session_type = _DOW_TO_SESSION[dow]
 
-    # ── Rest day ──────────────────────────────────────────────────────────────
-    if session_type == "rest":
-        return {
-            "status":  "rest",
-            "message": "Rest day — active recovery or mobility if you feel like it.",
-        }
+# ── Program catalog ───────────────────────────────────────────────────────────
+#
+# Every program day is a pure function of (track, program_idx, session_type,
+# week), so the whole catalog is compiled once at import: 2 tracks × 3 programs
+# × 6 session types × 4 weeks.  Each entry holds the finished payload (nested
+# lists frozen to tuples) and the payload pre-serialised to JSON.  Per-request
+# fields are spliced in by workout_json().
 
-    # ── No program selected yet (new user before track selector) ──────────────
-    if not state.get("program_start_iso"):
-        return {"no_program": True, "message": "No program selected yet"}
+class CatalogEntry(NamedTuple):
+    payload: Mapping            # read-only get_today_workout() payload
+    json:    bytes              # payload minus _REQUEST_FIELDS, serialised
 
-    # ── Program selected but start date hasn't arrived yet ────────────────────
-    start_iso = state.get("program_start_iso", "")
-    if str(today) < start_iso:
-        track    = state.get("program_track", "fighter")
-        programs = TRACK_PROGRAMS.get(track, TRACK_PROGRAMS["fighter"])
-        program  = programs[0]   # always preview Program 1, Week 1, Strength A
-        sa       = program.get("strength_a", {})
-        week1    = sa.get("weeks", {}).get(1, {})
-        return {
-            "status":           "pending",
-            "program_start_iso": start_iso,
-            "preview_label":    sa.get("name", "Strength A"),
-            "preview_main":     week1.get("main", ""),
-            "message":          f"Your program begins {start_iso}. Rest up and get ready.",
-        }
 
-    program_idx, current_week, weeks_elapsed = _get_program_and_week(state, today=today)
-    track    = state.get("program_track", "fighter")
-    programs = TRACK_PROGRAMS.get(track, TRACK_PROGRAMS["fighter"])
-    program  = programs[program_idx]
-    is_kyle  = (track == "kyle")
+_CATALOG_SESSIONS = ("strength_a", "strength_b", "strength_c", "strength_d",
+                     "mobility_a", "mobility_b")
+_REQUEST_FIELDS   = ("suggested_weight",)
+
+
+def _build_program_workout(track: str, program_idx: int, session_type: str,
+                           current_week: int) -> dict:
+    """The get_today_workout() payload for one program day (catalog build only)."""
+    program      = TRACK_PROGRAMS[track][program_idx]
+    is_kyle      = (track == "kyle")
     current_prog = program_idx + 1          # 1–3
     track_key    = _SESSION_TRACK_KEY.get(session_type, "day_a_strength")
 
-    # ── Custom track (legacy support) ────────────────────────────────────────
-    custom_key = state.get("track", "")
-    if custom_key and custom_key.startswith("custom_"):
-        ct = _get_custom_track(state, custom_key)
-        if ct:
-            mc  = state.setdefault("microcycle", {"id": 0, "sessions_completed": 0,
-                                                   "start_date": str(today), "completed": False})
-            idx = mc.get("sessions_completed", 0)
-            sessions_needed = len(ct["sessions"])
-            if idx >= sessions_needed:
-                return {"status": "cycle_complete",
-                        "message": "Cycle complete! Start a new track."}
-            sess   = ct["sessions"][idx]
-            std_kg = float(sess.get("std_kg", 16) or 16)
-            return {
-                "status":           "active",
-                "track_key":        custom_key,
-                "track_name":       ct["name"],
-                "day_type":         "strength",
-                "focus":            "",
-                "week_label":       sess.get("week_label", ""),
-                "session_idx":      idx,
-                "total_sessions":   sessions_needed,
-                "main":             sess.get("main", ""),
-                "std_kg":           std_kg,
-                "full_body_block":  sess.get("full_body_block", sess.get("accessory", [])),
-                "focus_work":       sess.get("focus_work", []),
-                "arms":             sess.get("arms", []),
-                "finisher":         sess.get("finisher", ""),
-                "bell_guidance":    "",
-                "cycle_week":       current_week,
-                "suggested_weight": std_kg,
-            }
-
     # ── Mobility / Run-Day sessions ───────────────────────────────────────────
     if session_type in ("mobility_a", "mobility_b"):
         mob_key = "A" if session_type == "mobility_a" else "B"
@@ -2878,6 +3172,150 @@ def get_today_workout(state: dict, for_date: dt.date | None = None) -> dict:
     return result
 
 
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if type(value) is MappingProxyType:
+        return {k: _thaw(v) for k, v in value.items()}
+    if type(value) is tuple:
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _dumps(value) -> bytes:
+    # Same encoding as starlette's JSONResponse.
+    return json.dumps(value, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _compile_catalog() -> Mapping:
+    catalog = {}
+    for track, programs in TRACK_PROGRAMS.items():
+        for program_idx in range(len(programs)):
+            for session_type in _CATALOG_SESSIONS:
+                for week in (1, 2, 3, 4):
+                    payload = _build_program_workout(track, program_idx, session_type, week)
+                    payload["exercises"] = _exercise_records(payload)
+                    static = {k: v for k, v in payload.items() if k not in _REQUEST_FIELDS}
+                    catalog[(track, program_idx, session_type, week)] = CatalogEntry(
+                        payload=_freeze(payload),
+                        json=_dumps(static),
+                    )
+    # Lines not reachable through get_today_workout are parsed too, so every
+    # prescription in the program data has been through the parser once.
+    for pairs in ARMS_ROTATION.values():
+        for lines in pairs.values():
+            for line in lines:
+                parse_prescription(line)
+    return MappingProxyType(catalog)
+
+
+def workout_json(entry: CatalogEntry, **request_fields) -> bytes:
+    """Serialised payload for a catalog entry with per-request fields merged in
+    (defaults come from the entry, e.g. suggested_weight = std_kg)."""
+    fields = {k: request_fields.get(k, entry.payload.get(k)) for k in _REQUEST_FIELDS}
+    return entry.json[:-1] + b"," + _dumps(fields)[1:]
+
+
+CATALOG = _compile_catalog()
+
+# /api/movements body, encoded once; the ETag is a digest of those bytes.
+MOVEMENTS_JSON = _dumps(get_movements())
+MOVEMENTS_ETAG = f'"{hashlib.sha256(MOVEMENTS_JSON).hexdigest()[:32]}"'
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def get_today_workout(state: dict, for_date: dt.date | None = None) -> dict:
+    entry = get_today_entry(state, for_date)
+    return _thaw(entry.payload) if isinstance(entry, CatalogEntry) else entry
+
+
+def get_today_entry(state: dict, for_date: dt.date | None = None) -> "CatalogEntry | dict":
+    """Today's workout.  Program days are served straight from CATALOG as a
+    shared, read-only CatalogEntry; rest days, previews and custom tracks are
+    built per call as plain dicts."""
+    today        = for_date or dt.date.today()
+    dow          = today.weekday()          # 0=Mon … 6=Sun
+    session_type = _DOW_TO_SESSION[dow]
+
+    # ── Rest day ──────────────────────────────────────────────────────────────
+    if session_type == "rest":
+        return {
+            "status":  "rest",
+            "message": "Rest day — active recovery or mobility if you feel like it.",
+        }
+
+    # ── No program selected yet (new user before track selector) ──────────────
+    if not state.get("program_start_iso"):
+        return {"no_program": True, "message": "No program selected yet"}
+
+    # ── Program selected but start date hasn't arrived yet ────────────────────
+    start_iso = state.get("program_start_iso", "")
+    if str(today) < start_iso:
+        track    = state.get("program_track", "fighter")
+        programs = TRACK_PROGRAMS.get(track, TRACK_PROGRAMS["fighter"])
+        program  = programs[0]   # always preview Program 1, Week 1, Strength A
+        sa       = program.get("strength_a", {})
+        week1    = sa.get("weeks", {}).get(1, {})
+        return {
+            "status":           "pending",
+            "program_start_iso": start_iso,
+            "preview_label":    sa.get("name", "Strength A"),
+            "preview_main":     week1.get("main", ""),
+            "message":          f"Your program begins {start_iso}. Rest up and get ready.",
+        }
+
+    program_idx, current_week, weeks_elapsed = _get_program_and_week(state, today=today)
+
+    # ── Custom track (legacy support) ────────────────────────────────────────
+    custom_key = state.get("track", "")
+    if custom_key and custom_key.startswith("custom_"):
+        ct = _get_custom_track(state, custom_key)
+        if ct:
+            mc  = state.setdefault("microcycle", {"id": 0, "sessions_completed": 0,
+                                                   "start_date": str(today), "completed": False})
+            idx = mc.get("sessions_completed", 0)
+            sessions_needed = len(ct["sessions"])
+            if idx >= sessions_needed:
+                return {"status": "cycle_complete",
+                        "message": "Cycle complete! Start a new track."}
+            sess    = ct["sessions"][idx]
+            std_kg  = float(sess.get("std_kg", 16) or 16)
+            payload = {
+                "status":           "active",
+                "track_key":        custom_key,
+                "track_name":       ct["name"],
+                "day_type":         "strength",
+                "focus":            "",
+                "week_label":       sess.get("week_label", ""),
+                "session_idx":      idx,
+                "total_sessions":   sessions_needed,
+                "main":             sess.get("main", ""),
+                "std_kg":           std_kg,
+                "full_body_block":  sess.get("full_body_block", sess.get("accessory", [])),
+                "focus_work":       sess.get("focus_work", []),
+                "arms":             sess.get("arms", []),
+                "finisher":         sess.get("finisher", ""),
+                "bell_guidance":    "",
+                "cycle_week":       current_week,
+                "suggested_weight": std_kg,
+            }
+            payload["exercises"] = _exercise_records(payload)
+            return payload
+
+    track = state.get("program_track", "fighter")
+    if track not in TRACK_PROGRAMS:
+        track = "fighter"
+    return CATALOG[(track, program_idx, session_type, current_week)]
+
+
 def get_track_detail(key: str) -> dict | None:
     """Returns detail for a built-in program track key like 'program_1'."""
     if key.startswith("program_"):
@@ -2928,7 +3366,9 @@ def init_track(state: dict, key: str) -> str:
 
 
 def log_rec(state: dict, weights_lbs: dict | None = None) -> str:
-    workout = get_today_workout(state)
+    workout = get_today_entry(state)
+    if isinstance(workout, CatalogEntry):
+        workout = workout.payload
     if workout.get("status") == "rest":
         return "Rest day — nothing to log as a recommended session."
     if workout.get("status") != "active":
@@ -3056,7 +3496,14 @@ def get_streak_info(state: dict) -> dict:
     # it is NOT added to streak_weeks until it becomes a past week.
 
     last_week_date = today - dt.timedelta(weeks=1)
-    last_week_hit  = len(week_days.get(_week_key(last_week_date), set())) >= WK_TARGET
+    last_week      = len(week_days.get(_week_key(last_week_date), set()))
+    return streak_info(today, this_week, last_week, streak_weeks)
+
+
+def streak_info(today: dt.date, this_week: int, last_week: int, streak_weeks: int) -> dict:
+    """/api/streak payload from active-day counts for this week and last week
+    and the number of consecutive qualifying past weeks."""
+    last_week_hit        = last_week >= WK_TARGET
     days_remaining       = 7 - today.isoweekday()
     activities_remaining = max(0, WK_TARGET - this_week)
 
@@ -9,37 +9,79 @@ Env vars:
                  When unset, falls back to local SQLite for development only.
   DB_PATH        SQLite file path (default: olympus.db).
                  Ignored when DATABASE_URL is set.
+  SQLITE_PROFILE          "dev" (default) or "production".  The production
+                          profile enables WAL, synchronous=NORMAL, mmap and a
+                          busy timeout, and funnels writes through one writer
+                          thread that group-commits queued transactions.
+  SQLITE_WRITE_BATCH      Max queued writes committed together (default 64).
+  LEGACY_CACHE_SIZE       Max users whose decoded legacy state is kept in
+                          memory (default 256).  0 disables the cache.
+  LEGACY_CACHE_TTL        Seconds a cached state may be served (default 300).
+  LEGACY_FLUSH_INTERVAL   Seconds between write-behind flushes (default 2).
+  WORKER_THREADS          Request worker threads (see app.py); the connection
+                          pool is sized to cover them (default 40).
 
 Persistent game data stored in the database (no global vars, no local files):
   users           — account credentials
   player_estate   — full estate state: laurels, drachmae, blessings, buildings,
                     inventory, sanctuary, army, relics, trophies, titles (JSON)
-  player_legacy   — legacy tracker state: microcycle progress, program tracks,
-                    journey miles, week_log, badges (JSON)
+  player_legacy   — legacy tracker settings: program track, start date,
+                    microcycle progress, custom tracks (small JSON record)
+  workout_sessions — append-only program/custom session log (legacy "workouts")
+  cardio_log      — append-only ruck / run / walk log (legacy "*_log")
+  user_week       — per-user activity count per ISO week (legacy "week_log")
+                    and a 7-bit mask of the days in that week with activity
+  user_summary    — per-user running totals (miles by kind, session and
+                    activity counts), maintained alongside every log insert,
+                    plus the cached weekly streak
+  movement_latest — per-user, per-movement copy of the most recent workouts row
+                    with sets/reps, maintained on every workouts write
   workouts        — individual workout rows for history / edit / delete
 """
-import json, os, datetime as dt, logging
+import copy, json, os, datetime as dt, logging, hashlib, threading, time, atexit, sqlite3, queue
+from concurrent.futures import Future
+from contextvars import ContextVar
+from collections import OrderedDict
 from pathlib import Path
 from contextlib import contextmanager
 from typing import Generator
 
 import sqlalchemy as sa
-from sqlalchemy import create_engine, text, MetaData
+from sqlalchemy import create_engine, text, MetaData, event
 from sqlalchemy.orm import sessionmaker, Session
 
 log = logging.getLogger(__name__)
 
 # ── Engine ────────────────────────────────────────────────────────────────────
 
-_DATABASE_URL = os.environ.get("DATABASE_URL", "").strip()
+_DATABASE_URL   = os.environ.get("DATABASE_URL", "").strip()
+_HAS_RETURNING  = True   # UPDATE/DELETE … RETURNING (PostgreSQL, SQLite ≥ 3.35)
+_SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "dev").strip().lower()
+_WRITE_BATCH    = int(os.environ.get("SQLITE_WRITE_BATCH", "64"))
+
+# app.py runs request handlers on WORKER_THREADS threads, each of which may hold
+# a connection for its whole request, so the pool must never be the smaller of
+# the two.  The spare connections cover the writer and flusher threads.
+WORKER_THREADS  = int(os.environ.get("WORKER_THREADS", "40"))
+_POOL_SIZE      = 5
+_POOL_OVERFLOW  = max(10, WORKER_THREADS + 5 - _POOL_SIZE)
+
+# Applied to every connection by the SQLite production profile.
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",      # durable at checkpoints; safe with WAL
+    "PRAGMA mmap_size = 268435456",     # 256 MB
+    "PRAGMA cache_size = -65536",       # 64 MB
+    "PRAGMA busy_timeout = 5000",
+)
 
 if _DATABASE_URL:
     engine = create_engine(
         _DATABASE_URL,
         pool_pre_ping=True,   # validate connection before checkout from pool
         pool_recycle=300,     # recycle connections every 5 min (Render sleeps)
-        pool_size=5,
-        max_overflow=10,
+        pool_size=_POOL_SIZE,
+        max_overflow=_POOL_OVERFLOW,
     )
     _IS_PG = True
     log.info("Database: PostgreSQL (DATABASE_URL is set)")
@@ -48,8 +90,34 @@ else:
     engine = create_engine(
         f"sqlite:///{_DB_PATH}",
         connect_args={"check_same_thread": False},
+        pool_size=_POOL_SIZE,
+        max_overflow=_POOL_OVERFLOW,
     )
     _IS_PG = False
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        _HAS_RETURNING = False
+    if _SQLITE_PROFILE == "production":
+        @event.listens_for(engine, "connect")
+        def _sqlite_connect(dbapi_conn, _record):
+            # Let SQLAlchemy, not pysqlite, issue BEGIN so SAVEPOINTs work.
+            dbapi_conn.isolation_level = None
+            cur = dbapi_conn.cursor()
+            for pragma in _SQLITE_PRAGMAS:
+                cur.execute(pragma)
+            cur.close()
+
+        log.info("SQLite production profile: WAL, single writer thread")
+    elif _SQLITE_PROFILE != "dev":
+        log.warning("Unknown SQLITE_PROFILE %r — using the dev profile", _SQLITE_PROFILE)
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        # Write transactions take the lock at BEGIN (see _write_session); the
+        # production profile issues every other BEGIN itself too.
+        if conn.get_execution_options().get("sqlite_immediate"):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        elif _SQLITE_PROFILE == "production":
+            conn.exec_driver_sql("BEGIN")
     log.warning(
         "DATABASE_URL is not set — using SQLite at '%s'.  "
         "All game data (users, workouts, laurels, blessings, estate, microcycle "
@@ -63,10 +131,16 @@ else:
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+# The request's unit of work, when one is open (see "Request unit of work").
+_request_uow: ContextVar[dict | None] = ContextVar("request_uow", default=None)
+
+
 def get_db() -> Generator[Session, None, None]:
     """
-    FastAPI dependency — yields a database session scoped to the HTTP request.
-    The session is always closed when the request completes.
+    FastAPI dependency — yields the database session for the HTTP request.
+    Inside a request unit of work this is the request's own session, so
+    statements run on the same connection and commit with everything else;
+    otherwise it is a fresh session, always closed when the request completes.
 
     Usage in route handlers::
 
@@ -77,8 +151,11 @@ def get_db() -> Generator[Session, None, None]:
         @app.post("/some-route")
         def some_route(sess: Session = Depends(db.get_db)):
             row = sess.execute(text("SELECT ..."), {...}).fetchone()
-            sess.commit()
     """
+    uow = _request_uow.get()
+    if uow is not None and uow["session"] is not None:
+        yield uow["session"]
+        return
     session = SessionLocal()
     try:
         yield session
@@ -91,7 +168,13 @@ def _db():
     """
     Internal context manager used by all db helper functions.
     Automatically commits on success; rolls back and re-raises on any exception.
+    Inside a request unit of work it joins the request's session instead and
+    leaves the commit to the end of the request.
     """
+    uow = _request_uow.get()
+    if uow is not None and uow["session"] is not None:
+        yield uow["session"]
+        return
     session = SessionLocal()
     try:
         yield session
@@ -103,6 +186,186 @@ def _db():
         session.close()
 
 
+# ── Single-writer queue (SQLite production profile) ───────────────────────────
+#
+# SQLite allows one writer at a time; with many request threads each opening
+# its own write transaction they queue on the file lock and time out.  Under
+# the production profile every write helper hands its work to _write(), which
+# queues it for one dedicated writer thread.  The writer drains the queue and
+# runs the whole batch in a single transaction — one fsync for many writes —
+# with a SAVEPOINT per job so a failing job rolls back alone.  The caller
+# blocks until the batch has committed and gets its job's result or exception.
+# PostgreSQL and the dev profile run the job inline in its own transaction.
+# Inside a request unit of work every backend runs it in the request's
+# transaction instead (see "Request unit of work").
+
+_USE_WRITER   = not _IS_PG and _SQLITE_PROFILE == "production"
+_write_queue: "queue.Queue[tuple]" = queue.Queue()
+_writer: threading.Thread | None = None
+_writer_lock  = threading.Lock()
+_write_stats  = {"jobs": 0, "batches": 0}
+
+
+def _write(fn):
+    """Run fn(session) in a write transaction and return its result."""
+    uow = _request_uow.get()
+    if uow is not None:
+        uow["writes"] += 1
+        return fn(_uow_session(uow))
+    if not _USE_WRITER or threading.current_thread() is _writer:
+        with _db() as sess:
+            return fn(sess)
+    _start_writer()
+    fut: Future = Future()
+    _write_queue.put((fn, fut))
+    return fut.result()
+
+
+def _write_session() -> Session:
+    """A session for writing.  On SQLite its transaction begins IMMEDIATE, taking
+    the write lock before anything is read: a deferred transaction that has read
+    cannot take it once another writer has committed."""
+    session = SessionLocal()
+    if not _IS_PG:
+        session.connection(execution_options={"sqlite_immediate": True})
+    return session
+
+
+def _writer_loop() -> None:
+    while True:
+        batch = [_write_queue.get()]
+        while len(batch) < _WRITE_BATCH:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+        results = []
+        session = _write_session()
+        try:
+            for fn, fut in batch:
+                try:
+                    with session.begin_nested():
+                        results.append((fut, fn(session), None))
+                except Exception as exc:
+                    results.append((fut, None, exc))
+            session.commit()
+        except Exception as exc:
+            session.rollback()
+            results = [(fut, None, exc) for _fn, fut in batch]
+        finally:
+            session.close()
+        _write_stats["jobs"]    += len(batch)
+        _write_stats["batches"] += 1
+        for fut, result, exc in results:
+            if exc is None:
+                fut.set_result(result)
+            else:
+                fut.set_exception(exc)
+
+
+def _start_writer() -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name="sqlite-writer", daemon=True)
+            _writer.start()
+
+
+def write_stats() -> dict:
+    return {"writer": _USE_WRITER, **_write_stats}
+
+
+# ── Request unit of work ──────────────────────────────────────────────────────
+#
+# One HTTP request usually calls several helpers (load_legacy, save_legacy,
+# append_legacy_entry, insert_workout, get_rev …).  Inside unit_of_work() their
+# writes share one session and nothing is committed until finish_unit_of_work(),
+# once, at the end of the request: a request's writes land together or not at
+# all.
+#
+# On PostgreSQL the session opens with the unit of work and serves the reads
+# too — one connection checkout.  SQLite has a single write lock, so there the
+# session opens at the request's first write (see _write_session) and holds
+# the lock until the request finishes; concurrent writers wait for it within
+# the busy timeout.  Reads before that first write run in their own short
+# transactions, reads after it join the session and see its writes.  The
+# production profile's writer thread only serves writes made outside a
+# request (the flusher, /register, /login).
+#
+# Cached legacy settings are written behind (see "Legacy state cache"), so a
+# unit of work also holds back the flusher for every user it changes; on
+# rollback their cached documents are discarded unwritten and only settings
+# left pending by earlier requests go back to the flusher.
+#
+# finish_unit_of_work() blocks; call it after leaving the unit_of_work() block.
+
+_uow_stats = {"requests": 0, "writing_requests": 0, "commits": 0}
+
+
+@contextmanager
+def unit_of_work():
+    uow   = {"session": SessionLocal() if _IS_PG else None,
+             "writes": 0, "commits": 0, "users": {}}
+    token = _request_uow.set(uow)
+    try:
+        yield uow
+    finally:
+        _request_uow.reset(token)
+
+
+def finish_unit_of_work(uow: dict, commit: bool) -> None:
+    """Commit (or roll back) the request's session and record its commit count."""
+    sess = uow["session"]
+    try:
+        if sess is not None:
+            if commit and sess.in_transaction():
+                sess.commit()
+                if uow["writes"]:
+                    uow["commits"] += 1
+            else:
+                sess.rollback()
+                commit = False
+    except Exception:
+        sess.rollback()
+        commit = False
+        raise
+    finally:
+        if sess is not None:
+            sess.close()
+        for user_id, pending in uow["users"].items():
+            if not commit:
+                # The cached document may hold changes that were just rolled back.
+                _cache_discard(user_id, pending)
+            _cache_release(user_id)
+        with _cache_lock:
+            _uow_stats["requests"]         += 1
+            _uow_stats["writing_requests"] += bool(uow["writes"])
+            _uow_stats["commits"]          += uow["commits"]
+
+
+def _uow_session(uow: dict) -> Session:
+    """The request's session, opened by its first write on SQLite."""
+    if uow["session"] is None:
+        uow["session"] = _write_session()
+    return uow["session"]
+
+
+def _uow_touch(user_id: int) -> None:
+    """Hold back the flusher for a user the request is about to change,
+    remembering the settings earlier requests left unwritten."""
+    uow = _request_uow.get()
+    if uow is not None and user_id not in uow["users"]:
+        uow["users"][user_id] = _cache_hold(user_id)
+
+
+def unit_of_work_stats() -> dict:
+    """Request counts, with commits per request that wrote anything."""
+    with _cache_lock:
+        n = _uow_stats["writing_requests"]
+        return {**_uow_stats,
+                "commits_per_request": round(_uow_stats["commits"] / n, 3) if n else 0.0}
+
+
 # ── Schema (created on every startup — safe / idempotent) ────────────────────
 
 _meta = MetaData()
@@ -151,6 +414,46 @@ sa.Table("workout_sessions", _meta,
     sa.Column("created_at",      sa.Text,    nullable=False),
 )
 
+sa.Table("cardio_log", _meta,
+    sa.Column("id",                sa.Integer, primary_key=True, autoincrement=True),
+    sa.Column("user_id",           sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+    sa.Column("kind",              sa.Text,    nullable=False),   # ruck | run | walk
+    sa.Column("date",              sa.Text,    nullable=False),
+    sa.Column("distance_miles",    sa.Float,   nullable=False),
+    sa.Column("weight_lbs",        sa.Float),
+    sa.Column("pace_min_per_mile", sa.Float),
+    sa.Column("created_at",        sa.Text,    nullable=False),
+    sa.Index("ix_cardio_log_user", "user_id", "id"),
+)
+
+sa.Table("user_week", _meta,
+    sa.Column("user_id",    sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+    sa.Column("week",       sa.Text,    primary_key=True),        # ISO "YYYY-WW"
+    sa.Column("activities", sa.Integer, nullable=False, server_default=sa.text("0")),
+    sa.Column("days",       sa.Integer, nullable=False, server_default=sa.text("0")),  # bit 0 = Mon
+)
+
+sa.Table("user_summary", _meta,
+    sa.Column("user_id",    sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+    sa.Column("ruck_miles", sa.Float,   nullable=False, server_default=sa.text("0")),
+    sa.Column("run_miles",  sa.Float,   nullable=False, server_default=sa.text("0")),
+    sa.Column("walk_miles", sa.Float,   nullable=False, server_default=sa.text("0")),
+    sa.Column("sessions",   sa.Integer, nullable=False, server_default=sa.text("0")),
+    sa.Column("activities", sa.Integer, nullable=False, server_default=sa.text("0")),
+    sa.Column("streak_weeks",   sa.Integer),
+    sa.Column("streak_through", sa.Text),   # ISO week the cached streak ends at
+)
+
+sa.Table("movement_latest", _meta,
+    sa.Column("user_id",    sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+    sa.Column("movement",   sa.Text,    primary_key=True),
+    sa.Column("workout_id", sa.Integer, nullable=False),
+    sa.Column("date",       sa.Text,    nullable=False),
+    sa.Column("sets",       sa.Integer),
+    sa.Column("reps",       sa.Integer),
+    sa.Column("weight_kg",  sa.Float),
+)
+
 sa.Table("schema_version", _meta,
     sa.Column("version", sa.Integer, nullable=False),
 )
@@ -159,6 +462,42 @@ sa.Table("schema_version", _meta,
 _meta.create_all(engine)
 log.info("Database tables verified / created.")
 
+# ── INSERT helper (dialect-aware RETURNING) ───────────────────────────────────
+
+def _insert(sess: Session, sql: str, params: dict) -> int:
+    """Execute an INSERT and return the new row's primary-key id."""
+    if _IS_PG:
+        result = sess.execute(text(sql + " RETURNING id"), params)
+        return result.scalar()
+    result = sess.execute(text(sql), params)
+    return result.lastrowid
+
+
+# ── Per-user data revision ────────────────────────────────────────────────────
+#
+# users.rev is bumped in the same transaction as every change to a user's
+# training data (legacy settings, activity logs, workout rows).  Clients use it
+# to tell whether their copy of the history is still current.
+
+_SQL_BUMP_REV = "UPDATE users SET rev = rev + 1 WHERE id = :uid"
+_SQL_GET_REV  = "SELECT rev FROM users WHERE id = :uid"
+
+
+def _bump_rev(sess: Session, user_id: int) -> int:
+    """Increment and return the user's data revision."""
+    if _HAS_RETURNING:
+        return sess.execute(text(_SQL_BUMP_REV + " RETURNING rev"),
+                            {"uid": user_id}).scalar() or 0
+    sess.execute(text(_SQL_BUMP_REV), {"uid": user_id})
+    return sess.execute(text(_SQL_GET_REV), {"uid": user_id}).scalar() or 0
+
+
+def get_rev(user_id: int) -> int:
+    """Current data revision for a user (0 before anything has been logged)."""
+    with _db() as sess:
+        return sess.execute(text(_SQL_GET_REV), {"uid": user_id}).scalar() or 0
+
+
 # ── Schema version tracking + migration system ────────────────────────────────
 #
 # Each migration is a dict with:
@@ -172,8 +511,85 @@ _MIGRATIONS = [
         "describe": "Add session_id column to workouts",
         "apply": lambda sess: _add_column_safe(sess, "workouts", "session_id", "INTEGER"),
     },
+    {
+        "version": 2,
+        "describe": "Move legacy activity logs out of the player_legacy blob",
+        "apply": lambda sess: _migrate_legacy_logs(sess),
+    },
+    {
+        "version": 3,
+        "describe": "Add secondary indexes for the per-user history queries",
+        "apply": lambda sess: _create_indexes(sess, [
+            ("ix_workouts_user_date",      "workouts",         "user_id, date, id"),
+            ("ix_workouts_user_movement",  "workouts",         "user_id, movement, date, id"),
+            ("ix_workouts_session",        "workouts",         "session_id"),
+            ("ix_workout_sessions_date",   "workout_sessions", "user_id, date, id"),
+            ("ix_users_username_lower",    "users",            "LOWER(username)"),
+        ]),
+    },
+    {
+        "version": 4,
+        "describe": "Add per-user data revision counter to users",
+        "apply": lambda sess: _add_column_safe(sess, "users", "rev",
+                                               "INTEGER NOT NULL DEFAULT 0"),
+    },
+    {
+        "version": 5,
+        "describe": "Backfill user_summary totals from the activity tables",
+        "apply": lambda sess: sess.execute(text("""
+            INSERT INTO user_summary
+                (user_id, ruck_miles, run_miles, walk_miles, sessions, activities)
+            SELECT u.id,
+                COALESCE((SELECT SUM(distance_miles) FROM cardio_log c
+                          WHERE c.user_id = u.id AND c.kind = 'ruck'), 0),
+                COALESCE((SELECT SUM(distance_miles) FROM cardio_log c
+                          WHERE c.user_id = u.id AND c.kind = 'run'), 0),
+                COALESCE((SELECT SUM(distance_miles) FROM cardio_log c
+                          WHERE c.user_id = u.id AND c.kind = 'walk'), 0),
+                (SELECT COUNT(*) FROM workout_sessions s WHERE s.user_id = u.id),
+                (SELECT COUNT(*) FROM workout_sessions s WHERE s.user_id = u.id)
+                  + (SELECT COUNT(*) FROM cardio_log c WHERE c.user_id = u.id)
+            FROM users u
+        """)),
+    },
+    {
+        "version": 6,
+        "describe": "Backfill movement_latest from workouts",
+        "apply": lambda sess: sess.execute(text("""
+            INSERT INTO movement_latest
+                (user_id, movement, workout_id, date, sets, reps, weight_kg)
+            SELECT user_id, movement, id, date, sets, reps, weight_kg FROM (
+                SELECT w.*, ROW_NUMBER() OVER (
+                    PARTITION BY user_id, movement ORDER BY date DESC, id DESC) AS rn
+                FROM workouts w
+                WHERE movement IS NOT NULL AND sets IS NOT NULL AND reps IS NOT NULL
+            ) latest
+            WHERE rn = 1
+        """)),
+    },
+    {
+        "version": 7,
+        "describe": "Index active days per ISO week and cache the weekly streak",
+        "apply": lambda sess: _backfill_active_days(sess),
+    },
 ]
 
+# Legacy state keys that live in their own tables rather than the JSON blob.
+# Everything else in the document (track, start date, microcycle, custom
+# tracks, …) is a small settings record and stays in player_legacy.data.
+_LEGACY_CARDIO_KINDS = {"ruck_log": "ruck", "run_log": "run", "walk_log": "walk"}
+_LEGACY_TABLE_KEYS   = ("workouts", "ruck_log", "run_log", "walk_log", "week_log",
+                        "total_ruck_miles", "total_run_miles", "total_walk_miles",
+                        "journey_miles")
+
+# user_summary counter bumped by an entry in each legacy log (cardio logs add
+# their distance, the session log adds one).
+_SUMMARY_COLUMN = {"workouts": "sessions", "ruck_log": "ruck_miles",
+                   "run_log": "run_miles", "walk_log": "walk_miles"}
+
+_SESSION_LOG_COLS = ("type", "details", "day_type", "session_type",
+                     "program", "week", "weights_lbs")
+
 
 def _add_column_safe(sess, table: str, col: str, col_type: str) -> None:
     """Add a column if it doesn't already exist (dialect-aware)."""
@@ -188,6 +604,106 @@ def _add_column_safe(sess, table: str, col: str, col_type: str) -> None:
         pass  # column already exists
 
 
+def _create_indexes(sess, indexes: list) -> None:
+    """Create (name, table, column-or-expression list) indexes if missing.
+    Both dialects accept IF NOT EXISTS and expression indexes."""
+    for name, table, cols in indexes:
+        sess.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+
+
+def _legacy_settings(data: dict) -> dict:
+    """Strip the table-backed keys from a legacy document, leaving the settings."""
+    return {k: v for k, v in data.items() if k not in _LEGACY_TABLE_KEYS}
+
+
+def _insert_legacy_entry(sess, user_id: int, log_key: str, entry: dict, now: str) -> int:
+    """Insert one legacy log entry into workout_sessions or cardio_log; return its id."""
+    if log_key == "workouts":
+        params = {"user_id": user_id, "date": str(entry.get("date") or ""),
+                  "created_at": now}
+        for col in _SESSION_LOG_COLS:
+            if entry.get(col) is not None:
+                params[col] = entry[col]
+        if "weights_lbs" in params:
+            params["weights_lbs"] = json.dumps(params["weights_lbs"])
+        cols         = ", ".join(params.keys())
+        placeholders = ", ".join(f":{k}" for k in params.keys())
+        return _insert(sess, f"INSERT INTO workout_sessions ({cols}) VALUES ({placeholders})",
+                       params)
+    return _insert(sess,
+        "INSERT INTO cardio_log (user_id, kind, date, distance_miles, weight_lbs, "
+        "pace_min_per_mile, created_at) "
+        "VALUES (:uid, :kind, :date, :miles, :lbs, :pace, :now)",
+        {"uid": user_id, "kind": _LEGACY_CARDIO_KINDS[log_key],
+         "date": str(entry.get("date") or ""),
+         "miles": float(entry.get("distance_miles") or 0),
+         "lbs": entry.get("weight_lbs"), "pace": entry.get("pace_min_per_mile"),
+         "now": now})
+
+
+def _migrate_legacy_logs(sess) -> None:
+    """One-shot conversion: copy every blob's session/cardio logs and week_log
+    into their tables, then rewrite the blob as a settings-only record."""
+    for col, col_type in (("type", "TEXT"), ("details", "TEXT"), ("day_type", "TEXT"),
+                          ("session_type", "TEXT"), ("program", "INTEGER"),
+                          ("week", "INTEGER"), ("weights_lbs", "TEXT")):
+        _add_column_safe(sess, "workout_sessions", col, col_type)
+    sess.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_workout_sessions_user "
+        "ON workout_sessions (user_id, id)"
+    ))
+    rows = sess.execute(text("SELECT user_id, data FROM player_legacy")).fetchall()
+    now  = dt.datetime.utcnow().isoformat()
+    for user_id, raw in rows:
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            log.warning("Skipping unreadable legacy blob for user %s", user_id)
+            continue
+        for log_key in ("workouts", *_LEGACY_CARDIO_KINDS):
+            for entry in data.get(log_key) or []:
+                if isinstance(entry, dict):
+                    _insert_legacy_entry(sess, user_id, log_key, entry, now)
+        for week, count in (data.get("week_log") or {}).items():
+            sess.execute(text(
+                "INSERT INTO user_week (user_id, week, activities) VALUES (:uid, :wk, :n)"
+            ), {"uid": user_id, "wk": week, "n": int(count or 0)})
+        sess.execute(text(
+            "UPDATE player_legacy SET data = :data WHERE user_id = :uid"
+        ), {"uid": user_id, "data": json.dumps(_legacy_settings(data), default=str)})
+        log.info("Migrated legacy logs for user %s", user_id)
+
+
+def _day_bit(date) -> tuple[str, int] | None:
+    """(ISO week key, weekday bit) for a YYYY-MM-DD date; None if unparsable."""
+    try:
+        iso = dt.date.fromisoformat(str(date)).isocalendar()
+    except ValueError:
+        return None
+    return f"{iso[0]}-{iso[1]:02d}", 1 << (iso[2] - 1)
+
+
+def _backfill_active_days(sess) -> None:
+    """Add user_week.days and the user_summary streak cache, then set each
+    week's day mask from the dates in workout_sessions and cardio_log."""
+    _add_column_safe(sess, "user_week",    "days",           "INTEGER NOT NULL DEFAULT 0")
+    _add_column_safe(sess, "user_summary", "streak_weeks",   "INTEGER")
+    _add_column_safe(sess, "user_summary", "streak_through", "TEXT")
+    masks: dict = {}
+    for user_id, date in sess.execute(text(
+        "SELECT user_id, date FROM workout_sessions "
+        "UNION ALL SELECT user_id, date FROM cardio_log"
+    )):
+        hit = _day_bit(date)
+        if hit:
+            masks[(user_id, hit[0])] = masks.get((user_id, hit[0]), 0) | hit[1]
+    for (user_id, week), days in masks.items():
+        sess.execute(text("""
+            INSERT INTO user_week (user_id, week, activities, days) VALUES (:uid, :wk, 0, :days)
+            ON CONFLICT(user_id, week) DO UPDATE SET days = :days
+        """), {"uid": user_id, "wk": week, "days": days})
+
+
 def _get_schema_version(sess) -> int:
     try:
         row = sess.execute(text("SELECT version FROM schema_version LIMIT 1")).fetchone()
@@ -227,49 +743,43 @@ def _run_migrations() -> None:
 
 _run_migrations()
 
-# ── INSERT helper (dialect-aware RETURNING) ───────────────────────────────────
-
-def _insert(sess: Session, sql: str, params: dict) -> int:
-    """Execute an INSERT and return the new row's primary-key id."""
-    if _IS_PG:
-        result = sess.execute(text(sql + " RETURNING id"), params)
-        return result.scalar()
-    result = sess.execute(text(sql), params)
-    return result.lastrowid
+# ── User management ───────────────────────────────────────────────────────────
 
+_SQL_SET_PASSWORD  = "UPDATE users SET password_hash = :h WHERE id = :id"
+_SQL_USER_BY_NAME  = "SELECT * FROM users WHERE LOWER(username) = LOWER(:username)"
+_SQL_USER_BY_ID    = "SELECT * FROM users WHERE id = :id"
 
-# ── User management ───────────────────────────────────────────────────────────
 
 def create_user(username: str, password_hash: str) -> int:
     """Insert a new user; return their id.  Raises ValueError on duplicate username."""
     now = dt.datetime.utcnow().isoformat()
     try:
-        with _db() as sess:
-            return _insert(
-                sess,
-                "INSERT INTO users (username, password_hash, created_at) "
-                "VALUES (:username, :password_hash, :created_at)",
-                {"username": username, "password_hash": password_hash, "created_at": now},
-            )
+        return _write(lambda sess: _insert(
+            sess,
+            "INSERT INTO users (username, password_hash, created_at) "
+            "VALUES (:username, :password_hash, :created_at)",
+            {"username": username, "password_hash": password_hash, "created_at": now},
+        ))
     except sa.exc.IntegrityError:
         raise ValueError("Username already taken")
 
 
+def set_password_hash(user_id: int, password_hash: str) -> None:
+    """Replace a user's stored hash (re-hash at the current cost on login)."""
+    _write(lambda sess: sess.execute(
+        text(_SQL_SET_PASSWORD), {"h": password_hash, "id": user_id},
+    ))
+
+
 def get_user_by_username(username: str) -> dict | None:
     with _db() as sess:
-        row = sess.execute(
-            text("SELECT * FROM users WHERE LOWER(username) = LOWER(:username)"),
-            {"username": username},
-        ).fetchone()
+        row = sess.execute(text(_SQL_USER_BY_NAME), {"username": username}).fetchone()
         return dict(row._mapping) if row else None
 
 
 def get_user_by_id(user_id: int) -> dict | None:
     with _db() as sess:
-        row = sess.execute(
-            text("SELECT * FROM users WHERE id = :id"),
-            {"id": user_id},
-        ).fetchone()
+        row = sess.execute(text(_SQL_USER_BY_ID), {"id": user_id}).fetchone()
         return dict(row._mapping) if row else None
 
 
@@ -281,51 +791,518 @@ def get_user_by_id(user_id: int) -> dict | None:
 # serialised as a single JSON blob.  Nothing is cached in memory; every request
 # loads fresh from the database and saves back after mutation.
 
+_SQL_LOAD_ESTATE = "SELECT data FROM player_estate WHERE user_id = :uid"
+
+
 def load_estate(user_id: int) -> dict | None:
     with _db() as sess:
-        row = sess.execute(
-            text("SELECT data FROM player_estate WHERE user_id = :uid"),
-            {"uid": user_id},
-        ).fetchone()
+        row = sess.execute(text(_SQL_LOAD_ESTATE), {"uid": user_id}).fetchone()
         return json.loads(row[0]) if row else None
 
 
 def save_estate(user_id: int, data: dict) -> None:
     now = dt.datetime.utcnow().isoformat()
-    with _db() as sess:
-        sess.execute(text("""
-            INSERT INTO player_estate (user_id, data, updated_at) VALUES (:uid, :data, :now)
-            ON CONFLICT(user_id) DO UPDATE SET
-                data       = excluded.data,
-                updated_at = excluded.updated_at
-        """), {"uid": user_id, "data": json.dumps(data, default=str), "now": now})
+    _write(lambda sess: sess.execute(text("""
+        INSERT INTO player_estate (user_id, data, updated_at) VALUES (:uid, :data, :now)
+        ON CONFLICT(user_id) DO UPDATE SET
+            data       = excluded.data,
+            updated_at = excluded.updated_at
+    """), {"uid": user_id, "data": json.dumps(data, default=str), "now": now}))
 
 
 # ── Per-user legacy workout state ─────────────────────────────────────────────
 #
-# Legacy state — microcycle progress, active program track, session history,
-# total journey miles, weekly activity log, badges — stored as JSON blob.
-# Never in memory or in local files.
+# Legacy state — microcycle progress, active program track, custom tracks —
+# is a small JSON settings record.  The unbounded parts of the document live in
+# append-only tables: session history in workout_sessions, cardio in
+# cardio_log, the weekly activity counter in user_week.  load_legacy()
+# reassembles the full document; logging an activity is one INSERT via
+# append_legacy_entry() rather than a rewrite of the whole blob.
+#
+# Decoded documents are kept in a per-process LRU cache (see "Legacy state
+# cache" below): reads are served from memory, settings writes are deferred and
+# skipped entirely when the settings hash is unchanged.
 
 def load_legacy(user_id: int) -> dict | None:
-    with _db() as sess:
-        row = sess.execute(
-            text("SELECT data FROM player_legacy WHERE user_id = :uid"),
-            {"uid": user_id},
-        ).fetchone()
-        return json.loads(row[0]) if row else None
+    """The user's legacy document, as the caller's own copy: changing it affects
+    nothing until it is passed to save_legacy() / append_legacy_entry()."""
+    data = _cache_get(user_id)
+    if data is not None:
+        return data
+    # Settings evicted from the cache but not yet written win over the stored blob.
+    with _cache_lock:
+        pending = _evicted.get(user_id)
+    data = _read_legacy(user_id, pending)
+    if data is not None:
+        _cache_fill(user_id, data, pending)
+    return data
 
 
 def save_legacy(user_id: int, data: dict) -> None:
+    """Persist the settings part of a legacy document.  Log entries are written
+    separately by append_legacy_entry() and are ignored here.  With the cache
+    enabled the write is deferred to the next flush."""
+    settings = _settings_json(data)
+    _uow_touch(user_id)
+    if _CACHE_SIZE <= 0:
+        _write_legacy_settings(user_id, settings, bump=True)
+        return
+    if _cache_save(user_id, data, settings):
+        # The blob itself is written behind; the revision must move now.
+        _write(lambda sess: _bump_rev(sess, user_id))
+
+
+def append_legacy_entry(user_id: int, log_key: str, entry: dict, week: str) -> None:
+    """Append one entry to a legacy log ('workouts', 'ruck_log', 'run_log' or
+    'walk_log') and bump that ISO week's activity count, in one transaction."""
     now = dt.datetime.utcnow().isoformat()
+    _uow_touch(user_id)
+
+    def _append(sess):
+        _insert_legacy_entry(sess, user_id, log_key, entry, now)
+        _bump_week(sess, user_id, week)
+        _mark_active_day(sess, user_id, entry.get("date"))
+        _bump_summary(sess, user_id, log_key, entry)
+        _bump_rev(sess, user_id)
+
+    try:
+        _write(_append)
+    except Exception:
+        _cache_invalidate(user_id)
+        raise
+    _cache_append(user_id, log_key, entry, week)
+
+
+def _bump_summary(sess, user_id: int, log_key: str, entry: dict) -> None:
+    """Add one log entry to the user's running totals, in the caller's transaction."""
+    col   = _SUMMARY_COLUMN[log_key]
+    delta = 1 if log_key == "workouts" else float(entry.get("distance_miles") or 0)
+    sess.execute(text(f"""
+        INSERT INTO user_summary (user_id, {col}, activities) VALUES (:uid, :d, 1)
+        ON CONFLICT(user_id) DO UPDATE SET
+            {col}      = user_summary.{col} + :d,
+            activities = user_summary.activities + 1
+    """), {"uid": user_id, "d": delta})
+
+
+def _bump_week(sess, user_id: int, week: str) -> None:
+    sess.execute(text("""
+        INSERT INTO user_week (user_id, week, activities) VALUES (:uid, :wk, 1)
+        ON CONFLICT(user_id, week) DO UPDATE SET
+            activities = user_week.activities + 1
+    """), {"uid": user_id, "wk": week})
+
+
+def legacy_user_ids() -> list:
+    """Ids of every user with a stored legacy state (for bulk maintenance jobs)."""
     with _db() as sess:
-        sess.execute(text("""
-            INSERT INTO player_legacy (user_id, data, updated_at) VALUES (:uid, :data, :now)
-            ON CONFLICT(user_id) DO UPDATE SET
-                data       = excluded.data,
-                updated_at = excluded.updated_at
-        """), {"uid": user_id, "data": json.dumps(data, default=str), "now": now})
+        return [r[0] for r in sess.execute(text("SELECT user_id FROM player_legacy"))]
+
+
+def _settings_json(data: dict) -> str:
+    return json.dumps(_legacy_settings(data), default=str, sort_keys=True)
+
+
+_SQL_LEGACY_BLOB     = "SELECT data FROM player_legacy WHERE user_id = :uid"
+_SQL_LEGACY_SESSIONS = ("SELECT date, type, details, day_type, session_type, program, week, "
+                        "weights_lbs FROM workout_sessions WHERE user_id = :uid ORDER BY id ASC")
+_SQL_LEGACY_CARDIO   = ("SELECT kind, date, distance_miles, weight_lbs, pace_min_per_mile "
+                        "FROM cardio_log WHERE user_id = :uid ORDER BY id ASC")
+_SQL_LEGACY_WEEKS    = ("SELECT week, activities FROM user_week "
+                        "WHERE user_id = :uid AND activities > 0")
+_SQL_SUMMARY         = ("SELECT ruck_miles, run_miles, walk_miles, sessions, activities "
+                        "FROM user_summary WHERE user_id = :uid")
+_SQL_SUMMARY_WEEK    = "SELECT activities FROM user_week WHERE user_id = :uid AND week = :wk"
+
+
+def _read_legacy(user_id: int, settings: str | None = None) -> dict | None:
+    """Load the settings blob (or use `settings`, when given) and reassemble
+    the logs from their tables."""
+    with _db() as sess:
+        if settings is None:
+            row = sess.execute(text(_SQL_LEGACY_BLOB), {"uid": user_id}).fetchone()
+            if not row:
+                return None
+            settings = row[0]
+        data = json.loads(settings)
+
+        workouts = []
+        for r in sess.execute(text(_SQL_LEGACY_SESSIONS), {"uid": user_id}):
+            entry = {k: v for k, v in r._mapping.items() if v is not None}
+            if "weights_lbs" in entry:
+                entry["weights_lbs"] = json.loads(entry["weights_lbs"])
+            workouts.append(entry)
+
+        logs: dict = {key: [] for key in _LEGACY_CARDIO_KINDS}
+        log_key_for = {kind: key for key, kind in _LEGACY_CARDIO_KINDS.items()}
+        for r in sess.execute(text(_SQL_LEGACY_CARDIO), {"uid": user_id}):
+            entry = {"date": r.date, "distance_miles": r.distance_miles}
+            if r.weight_lbs is not None:
+                entry["weight_lbs"] = r.weight_lbs
+            if r.pace_min_per_mile is not None:
+                entry["pace_min_per_mile"] = r.pace_min_per_mile
+            logs[log_key_for[r.kind]].append(entry)
+
+        week_log = {
+            r.week: r.activities
+            for r in sess.execute(text(_SQL_LEGACY_WEEKS), {"uid": user_id})
+        }
+        summary = _read_summary(sess, user_id)
+
+    data.update(logs)
+    data["workouts"]         = workouts
+    data["week_log"]         = week_log
+    data["total_ruck_miles"] = summary["total_ruck_miles"]
+    data["total_run_miles"]  = summary["total_run_miles"]
+    data["total_walk_miles"] = summary["total_walk_miles"]
+    data["journey_miles"]    = summary["journey_miles"]
+    return data
+
+
+def _read_summary(sess, user_id: int) -> dict:
+    row = sess.execute(text(_SQL_SUMMARY), {"uid": user_id}).fetchone()
+    ruck, run, walk, sessions, activities = row if row else (0.0, 0.0, 0.0, 0, 0)
+    return {
+        "total_ruck_miles": ruck,
+        "total_run_miles":  run,
+        "total_walk_miles": walk,
+        "journey_miles":    ruck + run + walk,
+        "sessions":         sessions,
+        "activities":       activities,
+    }
+
+
+def get_summary(user_id: int, week: str) -> dict:
+    """Lifetime totals plus the activity count for ISO week `week`, read from
+    the materialised user_summary / user_week rows (no history scan)."""
+    with _db() as sess:
+        summary = _read_summary(sess, user_id)
+        summary["this_week"] = sess.execute(
+            text(_SQL_SUMMARY_WEEK), {"uid": user_id, "wk": week},
+        ).scalar() or 0
+        return summary
+
+
+# ── Weekly activity index ─────────────────────────────────────────────────────
+#
+# user_week.days has bit n set when the user logged anything (session or
+# cardio) on ISO weekday n+1 of that week, so a week's unique active days are
+# a popcount and logging is one OR-upsert.  The streak — consecutive past weeks
+# with at least the target number of active days — is cached on user_summary
+# together with the week it runs through.  It is recomputed only when that week
+# rolls over, or when a back-dated entry lands in a week it already counted
+# (which clears streak_through).  _day_bit() is defined with the migrations.
+
+_SQL_CLEAR_STREAK  = ("UPDATE user_summary SET streak_through = NULL "
+                      "WHERE user_id = :uid AND streak_through >= :wk")
+_SQL_STREAK_WEEKS  = ("SELECT week, days FROM user_week "
+                      "WHERE user_id = :uid AND week <= :wk AND days != 0")
+_SQL_RECENT_WEEKS  = ("SELECT week, days FROM user_week "
+                      "WHERE user_id = :uid AND week IN (:this_wk, :last_wk)")
+_SQL_STREAK_CACHE  = "SELECT streak_weeks, streak_through FROM user_summary WHERE user_id = :uid"
+
+
+def _mark_active_day(sess, user_id: int, date) -> None:
+    """Set the day's bit in its week's mask, in the caller's transaction."""
+    hit = _day_bit(date)
+    if hit is None:
+        return
+    week, bit = hit
+    sess.execute(text("""
+        INSERT INTO user_week (user_id, week, activities, days) VALUES (:uid, :wk, 0, :bit)
+        ON CONFLICT(user_id, week) DO UPDATE SET days = user_week.days | :bit
+    """), {"uid": user_id, "wk": week, "bit": bit})
+    sess.execute(text(_SQL_CLEAR_STREAK), {"uid": user_id, "wk": week})
+
+
+def _compute_streak(sess, user_id: int, last_week: dt.date, target: int) -> int:
+    """Count qualifying weeks back from the week of `last_week` and cache the result."""
+    through = _day_bit(last_week)[0]
+    masks = dict(sess.execute(
+        text(_SQL_STREAK_WEEKS), {"uid": user_id, "wk": through},
+    ).fetchall())
+    streak, day = 0, last_week
+    while masks.get(_day_bit(day)[0], 0).bit_count() >= target:
+        streak += 1
+        day    -= dt.timedelta(weeks=1)
+    sess.execute(text("""
+        INSERT INTO user_summary (user_id, streak_weeks, streak_through) VALUES (:uid, :n, :wk)
+        ON CONFLICT(user_id) DO UPDATE SET
+            streak_weeks   = excluded.streak_weeks,
+            streak_through = excluded.streak_through
+    """), {"uid": user_id, "n": streak, "wk": through})
+    return streak
+
+
+def get_streak(user_id: int, today: dt.date, target: int) -> dict:
+    """Active days this week and last week plus the number of consecutive past
+    weeks (ending last week) with at least `target` active days."""
+    last_week = today - dt.timedelta(weeks=1)
+    this_wk, last_wk = _day_bit(today)[0], _day_bit(last_week)[0]
+    with _db() as sess:
+        masks = dict(sess.execute(
+            text(_SQL_RECENT_WEEKS),
+            {"uid": user_id, "this_wk": this_wk, "last_wk": last_wk},
+        ).fetchall())
+        row = sess.execute(text(_SQL_STREAK_CACHE), {"uid": user_id}).fetchone()
+    if row and row.streak_through == last_wk:
+        streak = row.streak_weeks
+    else:
+        streak = _write(lambda sess: _compute_streak(sess, user_id, last_week, target))
+    return {
+        "this_week":    masks.get(this_wk, 0).bit_count(),
+        "last_week":    masks.get(last_wk, 0).bit_count(),
+        "streak_weeks": streak,
+    }
+
+
+def _upsert_legacy_settings(sess, user_id: int, settings: str) -> None:
+    sess.execute(text("""
+        INSERT INTO player_legacy (user_id, data, updated_at) VALUES (:uid, :data, :now)
+        ON CONFLICT(user_id) DO UPDATE SET
+            data       = excluded.data,
+            updated_at = excluded.updated_at
+    """), {"uid": user_id, "data": settings, "now": dt.datetime.utcnow().isoformat()})
+
+
+def _write_legacy_settings(user_id: int, settings: str, bump: bool = False) -> None:
+    def _save(sess):
+        if bump:
+            _bump_rev(sess, user_id)
+        _upsert_legacy_settings(sess, user_id, settings)
 
+    _write(_save)
+
+
+# ── Legacy state cache ────────────────────────────────────────────────────────
+#
+# LRU of decoded legacy documents keyed by user_id.  Each entry holds:
+#   data      — the decoded document.  It is never handed out: readers get a
+#               copy, save_legacy() replaces its settings and
+#               append_legacy_entry() appends to its logs, so concurrent
+#               requests never see each other's half-made changes
+#   loaded    — monotonic time the entry was filled, for TTL eviction
+#   saved     — hash of the settings JSON last written to the database
+#   pending   — settings JSON awaiting a flush, or None when clean
+# Dirty entries are written by a background flusher every
+# LEGACY_FLUSH_INTERVAL seconds and at process exit.  Evicting a dirty entry
+# never writes under the lock or inside the evicting request: its settings move
+# to _evicted for the next flush, and load_legacy() takes them back if the user
+# returns first.  Users an open request is changing are skipped by the flush
+# until the request finishes.  The cache is per process: run a single
+# worker, or set LEGACY_CACHE_SIZE=0.
+
+_CACHE_SIZE     = int(os.environ.get("LEGACY_CACHE_SIZE", "256"))
+_CACHE_TTL      = float(os.environ.get("LEGACY_CACHE_TTL", "300"))
+_FLUSH_INTERVAL = float(os.environ.get("LEGACY_FLUSH_INTERVAL", "2"))
+
+_cache: "OrderedDict[int, dict]" = OrderedDict()
+_evicted: dict[int, str] = {}          # user_id -> settings JSON awaiting a flush
+_held: dict[int, int] = {}             # user_id -> open requests changing it
+_cache_lock    = threading.RLock()
+_flush_lock    = threading.Lock()      # one flush at a time keeps writes in order
+_cache_stats   = {"hits": 0, "misses": 0, "evictions": 0,
+                  "flushes": 0, "skipped_writes": 0}
+_flusher: threading.Thread | None = None
+
+
+def _hash(settings: str) -> str:
+    return hashlib.sha1(settings.encode()).hexdigest()
+
+
+def _copy_legacy(data: dict) -> dict:
+    """A copy of a document its holder may change freely.  Log entries are never
+    edited in place, so the table-backed values are copied one level deep and
+    only the small settings values in full."""
+    return {k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v)
+               if k in _LEGACY_TABLE_KEYS else copy.deepcopy(v)
+            for k, v in data.items()}
+
+
+def _cache_get(user_id: int) -> dict | None:
+    if _CACHE_SIZE <= 0:
+        return None
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry is None:
+            _cache_stats["misses"] += 1
+            return None
+        if time.monotonic() - entry["loaded"] > _CACHE_TTL:
+            _cache_stats["misses"] += 1
+            _cache_evict(user_id)
+            return None
+        _cache.move_to_end(user_id)
+        _cache_stats["hits"] += 1
+        return _copy_legacy(entry["data"])
+
+
+def _cache_fill(user_id: int, data: dict, pending: str | None) -> None:
+    """Cache a document just read from the database.  `pending` is the settings
+    it was read with from _evicted; the entry holds them until the next flush."""
+    if _CACHE_SIZE <= 0:
+        return
+    saved = _hash(_settings_json(data)) if pending is None else None
+    data  = _copy_legacy(data)
+    with _cache_lock:
+        if user_id not in _cache:
+            _cache[user_id] = {"data": data, "loaded": time.monotonic(),
+                               "saved": saved, "pending": pending}
+            if pending is not None and _evicted.get(user_id) == pending:
+                del _evicted[user_id]
+        _cache.move_to_end(user_id)
+        while len(_cache) > _CACHE_SIZE:
+            _cache_evict(next(iter(_cache)))
+
+
+def _cache_save(user_id: int, data: dict, settings: str) -> bool:
+    """Replace the cached document's settings with those of `data` (its logs
+    change only through _cache_append) and mark them for the next flush unless
+    they are what the database holds.  Returns True when the settings changed."""
+    digest = _hash(settings)
+    fresh  = copy.deepcopy(_legacy_settings(data))
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry is None:
+            # Not cached: the settings wait for the flush like an evicted entry's.
+            if _evicted.get(user_id) == settings:
+                return False
+            _evicted[user_id] = settings
+            _start_flusher()
+            return True
+        doc = entry["data"]
+        for key in [k for k in doc if k not in _LEGACY_TABLE_KEYS]:
+            del doc[key]
+        doc.update(fresh)
+        _cache.move_to_end(user_id)
+        current = _hash(entry["pending"]) if entry["pending"] is not None else entry["saved"]
+        if digest == entry["saved"]:
+            entry["pending"] = None
+            _cache_stats["skipped_writes"] += 1
+        elif settings != entry["pending"]:
+            entry["pending"] = settings
+            _start_flusher()
+        return digest != current
+
+
+def _cache_append(user_id: int, log_key: str, entry: dict, week: str) -> None:
+    """Apply a log append to the cached document as _read_legacy() would see it
+    after a reload, and as core's log_* functions apply it to the caller's copy."""
+    with _cache_lock:
+        cached = _cache.get(user_id)
+        if cached is None:
+            return
+        doc = cached["data"]
+        doc.setdefault(log_key, []).append(copy.deepcopy(entry))
+        week_log = doc.setdefault("week_log", {})
+        week_log[week] = week_log.get(week, 0) + 1
+        if log_key in _LEGACY_CARDIO_KINDS:
+            miles = entry.get("distance_miles") or 0.0
+            total = f"total_{_LEGACY_CARDIO_KINDS[log_key]}_miles"
+            doc[total]           = doc.get(total, 0.0) + miles
+            doc["journey_miles"] = doc.get("journey_miles", 0.0) + miles
+
+
+def _cache_evict(user_id: int) -> None:
+    """Drop an entry, handing unwritten settings to the flusher.  Caller holds the lock."""
+    entry = _cache.pop(user_id, None)
+    if entry is None:
+        return
+    _cache_stats["evictions"] += 1
+    if entry["pending"] is not None:
+        _evicted[user_id] = entry["pending"]
+        _start_flusher()
+
+
+def _cache_invalidate(user_id: int) -> None:
+    with _cache_lock:
+        _cache_evict(user_id)
+
+
+def _cache_hold(user_id: int) -> str | None:
+    """Keep the flusher off a user; returns the settings currently awaiting a flush."""
+    with _cache_lock:
+        _held[user_id] = _held.get(user_id, 0) + 1
+        entry = _cache.get(user_id)
+        return entry["pending"] if entry is not None else _evicted.get(user_id)
+
+
+def _cache_release(user_id: int) -> None:
+    with _cache_lock:
+        if _held.get(user_id, 0) > 1:
+            _held[user_id] -= 1
+        else:
+            _held.pop(user_id, None)
+
+
+def _cache_discard(user_id: int, pending: str | None) -> None:
+    """Drop an entry without writing it; `pending` (the settings awaiting a flush
+    before the rolled-back request) goes back to the flusher."""
+    with _cache_lock:
+        if _cache.pop(user_id, None) is not None:
+            _cache_stats["evictions"] += 1
+        _evicted.pop(user_id, None)
+        if pending is not None:
+            _evicted[user_id] = pending
+            _start_flusher()
+
+
+def flush_legacy_cache() -> int:
+    """Write the settings of every dirty document, cached or evicted, to the
+    database.  Returns the number of documents written.  Called by the flusher
+    thread and at shutdown; failed writes, and users an open request is
+    changing, stay queued for the next flush."""
+    with _flush_lock:
+        with _cache_lock:
+            dirty  = [(uid, settings, True) for uid, settings in _evicted.items()
+                      if uid not in _held]
+            dirty += [(uid, e["pending"], False) for uid, e in _cache.items()
+                      if e["pending"] is not None and uid not in _held]
+        written = 0
+        for user_id, settings, evicted in dirty:
+            try:
+                _write_legacy_settings(user_id, settings)
+            except Exception:
+                log.exception("Legacy state flush failed for user %s", user_id)
+                continue
+            written += 1
+            with _cache_lock:
+                if evicted:
+                    if _evicted.get(user_id) == settings:
+                        del _evicted[user_id]
+                else:
+                    entry = _cache.get(user_id)
+                    if entry is not None and entry["pending"] == settings:
+                        entry["pending"] = None
+                        entry["saved"]   = _hash(settings)
+                _cache_stats["flushes"] += 1
+        return written
+
+
+def legacy_cache_stats() -> dict:
+    with _cache_lock:
+        return {**_cache_stats, "size": len(_cache),
+                "dirty": sum(1 for e in _cache.values() if e["pending"] is not None)
+                         + len(_evicted)}
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(_FLUSH_INTERVAL)
+        flush_legacy_cache()
+        with _cache_lock:
+            now = time.monotonic()
+            for uid in [u for u, e in _cache.items() if now - e["loaded"] > _CACHE_TTL]:
+                _cache_evict(uid)
+
+
+def _start_flusher() -> None:
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, name="legacy-flush", daemon=True)
+        _flusher.start()
+
+
+atexit.register(flush_legacy_cache)
 
 
 # ── Workouts table — structured rows for history / edit / delete ──────────────
@@ -333,7 +1310,9 @@ def save_legacy(user_id: int, data: dict) -> None:
 def create_session(user_id: int, date: str, drachmae_earned: float = 0.0) -> int:
     """Create a workout_session record and return its id."""
     now = dt.datetime.utcnow().isoformat()
-    with _db() as sess:
+
+    def _create(sess):
+        _bump_rev(sess, user_id)
         return _insert(
             sess,
             "INSERT INTO workout_sessions (user_id, date, drachmae_earned, created_at) "
@@ -342,24 +1321,108 @@ def create_session(user_id: int, date: str, drachmae_earned: float = 0.0) -> int
              "drachmae_earned": drachmae_earned, "created_at": now},
         )
 
+    return _write(_create)
+
+
+def record_session(user_id: int, date: str, entry: dict | None, week: str,
+                   exercises: list, notes: str | None = None,
+                   duration_min: float | None = None,
+                   state: dict | None = None) -> int | None:
+    """Write a completed session atomically: the workout_sessions row for the
+    legacy log entry, its 'recommended' summary row and every exercise row
+    (one executemany), all in a single commit.  Returns the session id, or
+    None when there was no session entry to log (exercises are still saved).
+
+    Each exercise is a dict with movement, weight_kg, sets and reps.  `state`,
+    when given, is the caller's legacy document: its settings are saved under
+    the same revision bump — written behind like save_legacy()'s when the
+    cache is on, in this transaction when it is off."""
+    now      = dt.datetime.utcnow().isoformat()
+    settings = _settings_json(state) if state is not None else None
+    _uow_touch(user_id)
+    if settings is not None and _CACHE_SIZE > 0:
+        _cache_save(user_id, state, settings)
+
+    def _record(sess):
+        session_id = None
+        if entry is not None:
+            session_id = _insert_legacy_entry(sess, user_id, "workouts", entry, now)
+            _bump_week(sess, user_id, week)
+            _mark_active_day(sess, user_id, entry.get("date"))
+            _bump_summary(sess, user_id, "workouts", entry)
+            sess.execute(text(
+                "INSERT INTO workouts (user_id, date, type, drachmae_earned, notes, "
+                "duration_min, session_id, created_at) "
+                "VALUES (:uid, :date, 'recommended', 0, :notes, :dur, :sid, :now)"
+            ), {"uid": user_id, "date": date, "notes": notes, "dur": duration_min,
+                "sid": session_id, "now": now})
+        if exercises:
+            sess.execute(text(
+                "INSERT INTO workouts (user_id, date, type, drachmae_earned, movement, "
+                "weight_kg, sets, reps, session_id, created_at) "
+                "VALUES (:uid, :date, 'strength', 0, :movement, :weight_kg, :sets, "
+                ":reps, :sid, :now)"
+            ), [{"uid": user_id, "date": date, "sid": session_id, "now": now,
+                 "movement": ex["movement"], "weight_kg": ex["weight_kg"],
+                 "sets": ex["sets"], "reps": ex["reps"]} for ex in exercises])
+            _refresh_movement_latest(sess, user_id, [ex["movement"] for ex in exercises])
+        if settings is not None and _CACHE_SIZE <= 0:
+            _upsert_legacy_settings(sess, user_id, settings)
+        _bump_rev(sess, user_id)
+        return session_id
+
+    try:
+        session_id = _write(_record)
+    except Exception:
+        _cache_invalidate(user_id)
+        raise
+    if entry is not None:
+        _cache_append(user_id, "workouts", entry, week)
+    return session_id
+
+
+_SQL_KEYSET            = " AND (date, id) < (:bdate, :bid)"
+_SQL_SESSIONS_PAGE     = ("SELECT * FROM workout_sessions WHERE user_id = :uid{before} "
+                          "ORDER BY date DESC, id DESC LIMIT :limit")
+_SQL_SESSION_EXERCISES = ("SELECT * FROM workouts WHERE session_id IN :sids "
+                          "ORDER BY session_id, id ASC")
+
+
+def _keyset_before(before: tuple[str, int] | None, params: dict) -> str:
+    """WHERE fragment selecting rows after `before` in (date DESC, id DESC) order.
+    Seeks straight to the page boundary, so deep pages cost the same as the first."""
+    if before is None:
+        return ""
+    params.update(bdate=before[0], bid=before[1])
+    return _SQL_KEYSET
+
 
-def get_sessions(user_id: int, limit: int = 50) -> list:
-    """Return recent workout sessions with their exercises, newest first."""
+def get_sessions(user_id: int, limit: int = 50,
+                 before: tuple[str, int] | None = None) -> list:
+    """Return recent workout sessions with their exercises, newest first.
+
+    Two queries regardless of page size: one for the page of sessions, one
+    IN (...) query for all of their exercise rows, grouped in a single pass.
+    `before` is the (date, id) of the last session on the previous page."""
+    params: dict = {"uid": user_id, "limit": limit}
+    sql    = _SQL_SESSIONS_PAGE.format(before=_keyset_before(before, params))
     with _db() as sess:
-        session_rows = sess.execute(
-            text("SELECT * FROM workout_sessions WHERE user_id = :uid "
-                 "ORDER BY date DESC, id DESC LIMIT :limit"),
-            {"uid": user_id, "limit": limit},
-        ).fetchall()
-        sessions = []
-        for sr in session_rows:
-            sd = dict(sr._mapping)
-            exercise_rows = sess.execute(
-                text("SELECT * FROM workouts WHERE session_id = :sid ORDER BY id ASC"),
-                {"sid": sd["id"]},
-            ).fetchall()
-            sd["exercises"] = [dict(r._mapping) for r in exercise_rows]
-            sessions.append(sd)
+        sessions = [dict(r._mapping) for r in sess.execute(text(sql), params)]
+        if not sessions:
+            return []
+        by_id = {}
+        for sd in sessions:
+            if sd.get("weights_lbs"):
+                sd["weights_lbs"] = json.loads(sd["weights_lbs"])
+            sd["exercises"] = []
+            by_id[sd["id"]] = sd
+        exercise_rows = sess.execute(
+            text(_SQL_SESSION_EXERCISES).bindparams(sa.bindparam("sids", expanding=True)),
+            {"sids": list(by_id)},
+        )
+        for r in exercise_rows:
+            row = dict(r._mapping)
+            by_id[row["session_id"]]["exercises"].append(row)
         return sessions
 
 def insert_workout(user_id: int, date: str, type: str,
@@ -382,83 +1445,167 @@ def insert_workout(user_id: int, date: str, type: str,
             params[col] = kwargs[col]
     cols         = ", ".join(params.keys())
     placeholders = ", ".join(f":{k}" for k in params.keys())
-    with _db() as sess:
-        return _insert(sess, f"INSERT INTO workouts ({cols}) VALUES ({placeholders})", params)
+
+    def _ins(sess):
+        _bump_rev(sess, user_id)
+        wid = _insert(sess, f"INSERT INTO workouts ({cols}) VALUES ({placeholders})", params)
+        _refresh_movement_latest(sess, user_id, [params.get("movement")])
+        return wid
+
+    return _write(_ins)
+
 
 
+_SQL_MOVEMENT_HISTORY = ("SELECT sets, reps, weight_kg FROM workouts "
+                         "WHERE user_id = :uid AND movement = :mvt "
+                         "  AND sets IS NOT NULL AND reps IS NOT NULL "
+                         "ORDER BY date DESC, id DESC LIMIT 1")
+_SQL_WORKOUTS_PAGE    = ("SELECT * FROM workouts WHERE user_id = :uid{before} "
+                         "ORDER BY date DESC, id DESC LIMIT :limit")
+_SQL_WORKOUT_BY_ID    = "SELECT * FROM workouts WHERE id = :wid AND user_id = :uid"
+
 
 def get_movement_history(user_id: int, movement: str) -> dict | None:
     """Return the most recent sets/reps/weight_kg for a given movement slug."""
     with _db() as sess:
         row = sess.execute(
-            text(
-                "SELECT sets, reps, weight_kg FROM workouts "
-                "WHERE user_id = :uid AND movement = :mvt "
-                "  AND sets IS NOT NULL AND reps IS NOT NULL "
-                "ORDER BY date DESC, id DESC LIMIT 1"
-            ),
-            {"uid": user_id, "mvt": movement},
+            text(_SQL_MOVEMENT_HISTORY), {"uid": user_id, "mvt": movement},
         ).fetchone()
         return dict(row._mapping) if row else None
 
 
-def get_workouts(user_id: int, limit: int = 200) -> list:
-    """Return workouts for a user, newest first."""
+def get_workouts(user_id: int, limit: int = 200,
+                 before: tuple[str, int] | None = None) -> list:
+    """Return workouts for a user, newest first.  `before` is the (date, id)
+    of the last row on the previous page."""
+    params: dict = {"uid": user_id, "limit": limit}
+    sql    = _SQL_WORKOUTS_PAGE.format(before=_keyset_before(before, params))
     with _db() as sess:
-        rows = sess.execute(
-            text("SELECT * FROM workouts WHERE user_id = :uid "
-                 "ORDER BY date DESC, id DESC LIMIT :limit"),
-            {"uid": user_id, "limit": limit},
-        ).fetchall()
+        rows = sess.execute(text(sql), params).fetchall()
         return [dict(r._mapping) for r in rows]
 
 
-def update_workout(workout_id: int, user_id: int, **kwargs) -> bool:
-    """Update allowed fields of a workout.  Returns True if a row was changed."""
+def get_workout(workout_id: int, user_id: int) -> dict | None:
+    """Return one of the user's workout rows by primary key, or None."""
+    with _db() as sess:
+        row = sess.execute(
+            text(_SQL_WORKOUT_BY_ID), {"wid": workout_id, "uid": user_id},
+        ).fetchone()
+        return dict(row._mapping) if row else None
+
+
+_SQL_UPDATE_WORKOUT     = "UPDATE workouts SET {columns} WHERE id = :wid AND user_id = :uid"
+_SQL_DELETE_WORKOUT     = "DELETE FROM workouts WHERE id = :wid AND user_id = :uid"
+_SQL_LATEST_FOR_WORKOUT = ("SELECT movement FROM movement_latest "
+                           "WHERE user_id = :uid AND workout_id = :wid")
+
+
+def update_workout(workout_id: int, user_id: int, **kwargs) -> dict | None:
+    """Update allowed fields of a workout.  Returns the updated row, or None if
+    no row matched (or there was nothing to update)."""
     allowed = {"movement", "weight_kg", "sets", "reps",
                "distance_miles", "duration_min", "weight_lbs",
                "drachmae_earned", "notes"}
     updates = {k: v for k, v in kwargs.items() if k in allowed}
     if not updates:
-        return False
-    set_clause = ", ".join(f"{k} = :{k}" for k in updates)
-    # Prefix WHERE-clause params to avoid name collisions with SET columns
-    params = {**updates, "_wid": workout_id, "_uid": user_id}
-    with _db() as sess:
-        result = sess.execute(
-            text(f"UPDATE workouts SET {set_clause} WHERE id = :_wid AND user_id = :_uid"),
-            params,
-        )
-        return result.rowcount > 0
+        return None
+    # SET columns are bound as :set_<column>, clear of the WHERE parameters.
+    columns = ", ".join(f"{k} = :set_{k}" for k in updates)
+    params  = {**{f"set_{k}": v for k, v in updates.items()},
+               "wid": workout_id, "uid": user_id}
+    sql     = _SQL_UPDATE_WORKOUT.format(columns=columns)
+
+    def _update(sess):
+        # Movements whose latest row is this one may change, as may the new one.
+        stale = [r[0] for r in sess.execute(text(_SQL_LATEST_FOR_WORKOUT), params)]
+        if _HAS_RETURNING:
+            row = sess.execute(text(sql + " RETURNING *"), params).fetchone()
+        else:
+            result = sess.execute(text(sql), params)
+            row    = result.rowcount and sess.execute(
+                text(_SQL_WORKOUT_BY_ID), params).fetchone()
+        if not row:
+            return None
+        _refresh_movement_latest(sess, user_id, stale + [row.movement])
+        _bump_rev(sess, user_id)
+        return dict(row._mapping)
+
+    return _write(_update)
 
 
 def delete_workout(workout_id: int, user_id: int) -> dict | None:
     """Delete a workout; return its row data or None."""
-    with _db() as sess:
-        row = sess.execute(
-            text("SELECT * FROM workouts WHERE id = :wid AND user_id = :uid"),
-            {"wid": workout_id, "uid": user_id},
-        ).fetchone()
+    params = {"wid": workout_id, "uid": user_id}
+
+    def _delete(sess):
+        if _HAS_RETURNING:
+            row = sess.execute(text(_SQL_DELETE_WORKOUT + " RETURNING *"), params).fetchone()
+        else:
+            row = sess.execute(text(_SQL_WORKOUT_BY_ID), params).fetchone()
+            if row:
+                sess.execute(text(_SQL_DELETE_WORKOUT), params)
         if not row:
             return None
-        sess.execute(
-            text("DELETE FROM workouts WHERE id = :wid AND user_id = :uid"),
-            {"wid": workout_id, "uid": user_id},
-        )
+        _refresh_movement_latest(sess, user_id, [row.movement])
+        _bump_rev(sess, user_id)
         return dict(row._mapping)
 
+    return _write(_delete)
+
+
+_SQL_CLEAR_LATEST   = "DELETE FROM movement_latest WHERE user_id = :uid AND movement = :mvt"
+_SQL_REFRESH_LATEST = """
+    INSERT INTO movement_latest
+        (user_id, movement, workout_id, date, sets, reps, weight_kg)
+    SELECT user_id, movement, id, date, sets, reps, weight_kg FROM workouts
+    WHERE user_id = :uid AND movement = :mvt
+      AND sets IS NOT NULL AND reps IS NOT NULL
+    ORDER BY date DESC, id DESC LIMIT 1
+"""
+_SQL_MOVEMENT_LATEST = ("SELECT movement, workout_id, date, sets, reps, weight_kg "
+                        "FROM movement_latest WHERE user_id = :uid AND movement IN :mvts")
+_SQL_MOVEMENT_CHART  = ("SELECT date, sets, reps, weight_kg FROM workouts "
+                        "WHERE user_id = :uid AND movement = :mvt "
+                        "  AND sets IS NOT NULL AND reps IS NOT NULL AND weight_kg IS NOT NULL "
+                        "ORDER BY date ASC, id ASC LIMIT :limit")
+_SQL_LATEST_WEIGHT   = ("SELECT weight_kg FROM movement_latest "
+                        "WHERE user_id = :uid AND weight_kg > 0 "
+                        "ORDER BY date DESC, workout_id DESC LIMIT 1")
+
+
+def _refresh_movement_latest(sess, user_id: int, movements: list) -> None:
+    """Recompute movement_latest for the given movements from workouts, in the
+    caller's transaction.  Each is one index seek on ix_workouts_user_movement."""
+    for movement in {m for m in movements if m}:
+        params = {"uid": user_id, "mvt": movement}
+        sess.execute(text(_SQL_CLEAR_LATEST), params)
+        sess.execute(text(_SQL_REFRESH_LATEST), params)
+
+
+def get_movement_latest(user_id: int, movements: list) -> dict:
+    """Latest sets/reps/weight_kg/date for each of `movements` that the user has
+    logged, keyed by movement.  One primary-key lookup per movement."""
+    if not movements:
+        return {}
+    with _db() as sess:
+        rows = sess.execute(
+            text(_SQL_MOVEMENT_LATEST).bindparams(sa.bindparam("mvts", expanding=True)),
+            {"uid": user_id, "mvts": list(movements)},
+        )
+        return {r.movement: dict(r._mapping) for r in rows}
+
+
+def get_latest_weight(user_id: int) -> float | None:
+    """Weight of the user's most recent logged lift, if any."""
+    with _db() as sess:
+        return sess.execute(text(_SQL_LATEST_WEIGHT), {"uid": user_id}).scalar()
+
 
 def get_movement_history_all(user_id: int, movement: str, limit: int = 20) -> list:
     """Return up to limit rows for a movement, oldest first, for charting."""
     with _db() as sess:
         rows = sess.execute(
-            text(
-                "SELECT date, sets, reps, weight_kg FROM workouts "
-                "WHERE user_id = :uid AND movement = :mvt "
-                "  AND sets IS NOT NULL AND reps IS NOT NULL AND weight_kg IS NOT NULL "
-                "ORDER BY date ASC, id ASC LIMIT :limit"
-            ),
-            {"uid": user_id, "mvt": movement, "limit": limit},
+            text(_SQL_MOVEMENT_CHART), {"uid": user_id, "mvt": movement, "limit": limit},
         ).fetchall()
         return [dict(r._mapping) for r in rows]
 
@@ -482,3 +1629,87 @@ def backfill_recommended_notes() -> int:
               AND notes    != ''
         """))
         return result.rowcount
+
+
+# ── Query plan verification ───────────────────────────────────────────────────
+#
+# Every statement the helpers above issue with a WHERE clause, taken from the
+# same _SQL_* constants they execute, with representative parameters (a list
+# value is bound as an expanding IN list).  verify_query_plans() EXPLAINs each
+# one and fails if any of them has to read a whole table.  Register new
+# queries here when adding helpers.  Migrations and bulk maintenance jobs
+# (legacy_user_ids, backfill_recommended_notes) scan by design and are not
+# listed.
+
+_KEYSET = {"uid": 1, "limit": 50, "bdate": "2024-01-01", "bid": 1}
+
+_QUERY_PLANS = [
+    ("get_user_by_username",     _SQL_USER_BY_NAME,   {"username": "x"}),
+    ("get_user_by_id",           _SQL_USER_BY_ID,     {"id": 1}),
+    ("set_password_hash",        _SQL_SET_PASSWORD,   {"h": "x", "id": 1}),
+    ("get_rev",                  _SQL_GET_REV,        {"uid": 1}),
+    ("_bump_rev",                _SQL_BUMP_REV,       {"uid": 1}),
+    ("load_estate",              _SQL_LOAD_ESTATE,    {"uid": 1}),
+    ("load_legacy",              _SQL_LEGACY_BLOB,    {"uid": 1}),
+    ("load_legacy sessions",     _SQL_LEGACY_SESSIONS, {"uid": 1}),
+    ("load_legacy cardio",       _SQL_LEGACY_CARDIO,  {"uid": 1}),
+    ("load_legacy weeks",        _SQL_LEGACY_WEEKS,   {"uid": 1}),
+    ("get_summary",              _SQL_SUMMARY,        {"uid": 1}),
+    ("get_summary week",         _SQL_SUMMARY_WEEK,   {"uid": 1, "wk": "2024-01"}),
+    ("_mark_active_day",         _SQL_CLEAR_STREAK,   {"uid": 1, "wk": "2024-01"}),
+    ("get_streak weeks",         _SQL_RECENT_WEEKS,
+     {"uid": 1, "this_wk": "2024-02", "last_wk": "2024-01"}),
+    ("get_streak cache",         _SQL_STREAK_CACHE,   {"uid": 1}),
+    ("_compute_streak",          _SQL_STREAK_WEEKS,   {"uid": 1, "wk": "2024-01"}),
+    ("get_sessions",             _SQL_SESSIONS_PAGE.format(before=_SQL_KEYSET), _KEYSET),
+    ("get_sessions exercises",   _SQL_SESSION_EXERCISES, {"sids": [1, 2, 3]}),
+    ("get_workouts",             _SQL_WORKOUTS_PAGE.format(before=_SQL_KEYSET), _KEYSET),
+    ("get_workout",              _SQL_WORKOUT_BY_ID,  {"wid": 1, "uid": 1}),
+    ("get_movement_history",     _SQL_MOVEMENT_HISTORY, {"uid": 1, "mvt": "kb_swing"}),
+    ("get_movement_history_all", _SQL_MOVEMENT_CHART,
+     {"uid": 1, "mvt": "kb_swing", "limit": 20}),
+    ("get_movement_latest",      _SQL_MOVEMENT_LATEST, {"uid": 1, "mvts": ["a", "b"]}),
+    ("get_latest_weight",        _SQL_LATEST_WEIGHT,  {"uid": 1}),
+    ("update_workout",           _SQL_UPDATE_WORKOUT.format(columns="notes = :set_notes"),
+     {"set_notes": "x", "wid": 1, "uid": 1}),
+    ("update_workout movement_latest", _SQL_LATEST_FOR_WORKOUT, {"uid": 1, "wid": 1}),
+    ("delete_workout",           _SQL_DELETE_WORKOUT, {"wid": 1, "uid": 1}),
+    ("_refresh_movement_latest delete", _SQL_CLEAR_LATEST, {"uid": 1, "mvt": "kb_swing"}),
+    ("_refresh_movement_latest", _SQL_REFRESH_LATEST, {"uid": 1, "mvt": "kb_swing"}),
+]
+
+
+def _plan_scans_table(plan: list) -> bool:
+    if _IS_PG:
+        return any("Seq Scan" in line for line in plan)
+    # SQLite: "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX"
+    # walks an index in order, "SEARCH t USING …" is a seek.
+    return any(line.startswith("SCAN ") and " USING " not in line for line in plan)
+
+
+def verify_query_plans() -> list:
+    """EXPLAIN every registered query and raise RuntimeError if any of them
+    falls back to a full table scan.  Returns [(name, plan lines), …].
+
+    Run after deploying a schema change:
+        import db; db.verify_query_plans()
+    """
+    results, offenders = [], []
+    with _db() as sess:
+        if _IS_PG:
+            # Tiny tables make seq scans the cheapest plan; forbid them so the
+            # planner shows whether an index path exists at all.
+            sess.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, sql, params in _QUERY_PLANS:
+            prefix = "EXPLAIN " if _IS_PG else "EXPLAIN QUERY PLAN "
+            stmt   = text(prefix + sql).bindparams(*(
+                sa.bindparam(k, expanding=True) for k, v in params.items() if isinstance(v, list)))
+            rows   = sess.execute(stmt, params).fetchall()
+            plan   = [str(r[0]) if _IS_PG else str(r[-1]) for r in rows]
+            results.append((name, plan))
+            if _plan_scans_table(plan):
+                offenders.append(f"{name}: {' | '.join(plan)}")
+        sess.rollback()
+    if offenders:
+        raise RuntimeError("Full table scans in:\n  " + "\n  ".join(offenders))
+    return results
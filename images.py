@@ -0,0 +1,187 @@
+"""
+Responsive image derivatives for First Bell artwork.
+
+Run at build time, before the server starts:
+
+    python images.py            # rebuild only sources that changed
+    python images.py --force    # rebuild everything
+
+Sources:
+  <Monster>/<Variant>/<Monster>.png   monster artwork (Gold, Vibrant)
+  Pheidippides/*.png                  journey waypoints and the coin
+  static/firstbell-logo.png           app logo, plus the PWA icons
+
+Every source is resized to each width in SIZES that does not upscale it and
+encoded as AVIF (when Pillow has the codec) and WebP, plus PNG at the smaller
+sizes, under static/img/:
+
+  static/img/<key>.<size>.<fmt>      e.g. Cerberus-Gold.card.webp
+  static/img/icon-192.png            icons named in static/manifest.json
+  static/img/manifest.json           per-source srcset strings by format
+
+static/img/ is build output and not committed, except the two icons: they
+are also the page's favicon and its logo fallback, so a deploy that skips
+this script (the Procfile, a local uvicorn) still has them.  The frontend
+reads manifest.json to upgrade img[data-art] elements to <picture> sources;
+only the logo uses it so far.
+
+Output names are stable; content hashes are added when the app serves them
+(see "Static serving" in app.py), which also rewrites the /static/ URLs in
+manifest.json to those immutable names.  Each manifest entry records the
+hash of its source and of the settings below, so an unchanged source is
+skipped on the next run.  Changed sources are processed in parallel, one per
+worker process; outputs of removed sources are deleted.
+
+Pillow is a build-time dependency only; the server never imports this module.
+"""
+import argparse, hashlib, json, os, re, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = features = None
+
+ROOT     = Path(__file__).parent
+STATIC   = ROOT / "static"
+OUT      = STATIC / "img"
+MANIFEST = OUT / "manifest.json"
+LOGO     = STATIC / "firstbell-logo.png"
+
+SIZES    = {"thumb": 160, "card": 480, "full": 1024}
+ICONS    = (192, 512)
+FALLBACK = "card"                       # size used for the plain <img src>
+# PNG only serves browsers without WebP; a full-size PNG is as big as its source.
+PNG_SIZES = ("thumb", "card")
+ENCODERS = {
+    "avif": {"quality": 50, "speed": 6},
+    "webp": {"quality": 80, "method": 4},
+    "png":  {"optimize": True},
+}
+# Part of every source fingerprint: editing the settings rebuilds everything.
+_SETTINGS = json.dumps([SIZES, ICONS, PNG_SIZES, ENCODERS], sort_keys=True).encode()
+
+
+# ── Sources ───────────────────────────────────────────────────────────────────
+
+def _stem(key: str) -> str:
+    """A file-name stem for a source key that survives the static URL pattern."""
+    return re.sub(r"_*[^\w.-]+_*", "_", key.replace("/", "-"))
+
+
+def discover() -> dict:
+    """Source files by manifest key, e.g. "Cerberus/Gold", "Pheidippides/Sparta"."""
+    sources = {}
+    for art in sorted(ROOT.glob("*/*/*.png")):
+        monster, variant = art.parent.parent.name, art.parent.name
+        if art.stem == monster:
+            sources[f"{monster}/{variant}"] = art
+    for art in sorted((ROOT / "Pheidippides").glob("*.png")):
+        sources[f"Pheidippides/{art.stem}"] = art
+    sources["logo"] = LOGO
+    return sources
+
+
+def _fingerprint(path: Path) -> str:
+    h = hashlib.sha256(_SETTINGS)
+    h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+# ── Rendering (worker processes) ──────────────────────────────────────────────
+
+def _encode(img, fmt: str, dest: Path) -> None:
+    img.save(dest, fmt.upper(), **ENCODERS[fmt])
+
+
+def render(key: str, src: Path, formats: tuple, fingerprint: str) -> tuple[str, dict]:
+    """Write every derivative of one source; returns its manifest entry."""
+    stem = _stem(key)
+    with Image.open(src) as img:
+        img.load()
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        width, height = img.size
+        widths = {}
+        for size, w in SIZES.items():           # never upscale; drop duplicates
+            if min(w, width) not in widths.values():
+                widths[size] = min(w, width)
+        files, srcset = [], {fmt: [] for fmt in formats}
+        for size, w in widths.items():
+            scaled = img if w == width else img.resize(
+                (w, round(height * w / width)), Image.LANCZOS, reducing_gap=3.0)
+            for fmt in formats:
+                if fmt == "png" and size not in PNG_SIZES:
+                    continue
+                name = f"{stem}.{size}.{fmt}"
+                _encode(scaled, fmt, OUT / name)
+                files.append(name)
+                srcset[fmt].append(f"/static/img/{name} {w}w")
+        if src == LOGO:
+            for px in ICONS:
+                icon = Image.new("RGBA", (max(width, height),) * 2)
+                icon.paste(img, ((icon.width - width) // 2, (icon.height - height) // 2))
+                name = f"icon-{px}.png"
+                _encode(icon.resize((px, px), Image.LANCZOS), "png", OUT / name)
+                files.append(name)
+    fallback = FALLBACK if FALLBACK in widths else min(widths, key=widths.get)
+    return key, {
+        "width":  width,
+        "height": height,
+        "src":    f"/static/img/{stem}.{fallback}.png",
+        "srcset": {fmt: ", ".join(parts) for fmt, parts in srcset.items()},
+        "files":  files,
+        "source": fingerprint,
+    }
+
+
+# ── Build ─────────────────────────────────────────────────────────────────────
+
+def build(force: bool = False, workers: int | None = None) -> dict:
+    """Bring static/img up to date with the sources; returns the new manifest."""
+    if Image is None:
+        sys.exit("images.py needs Pillow: pip install Pillow")
+    formats = tuple(f for f in ENCODERS if f != "avif" or features.check("avif"))
+    if "avif" not in formats:
+        print("images: Pillow has no AVIF codec — building WebP and PNG only")
+    OUT.mkdir(exist_ok=True)
+    try:
+        old = json.loads(MANIFEST.read_text())
+    except (OSError, ValueError):
+        old = {}
+
+    manifest, jobs = {}, []
+    for key, src in discover().items():
+        fingerprint = _fingerprint(src)
+        entry = old.get(key)
+        if (not force and entry and entry["source"] == fingerprint
+                and set(entry["srcset"]) == set(formats)
+                and all((OUT / f).exists() for f in entry["files"])):
+            manifest[key] = entry
+        else:
+            jobs.append((key, src, formats, fingerprint))
+
+    t0 = time.perf_counter()
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for key, entry in pool.map(render, *zip(*jobs)):
+                manifest[key] = entry
+    manifest = dict(sorted(manifest.items()))
+
+    keep = {f for entry in manifest.values() for f in entry["files"]} | {MANIFEST.name}
+    stale = [p for p in OUT.iterdir() if p.is_file() and p.name not in keep]
+    for p in stale:
+        p.unlink()
+    MANIFEST.write_text(json.dumps(manifest, indent=1) + "\n")
+    print(f"images: {len(jobs)} rebuilt, {len(manifest) - len(jobs)} unchanged, "
+          f"{len(stale)} stale removed in {time.perf_counter() - t0:.1f}s")
+    return manifest
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--force", action="store_true", help="rebuild unchanged sources too")
+    ap.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    args = ap.parse_args()
+    build(args.force, args.workers)
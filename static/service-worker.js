@@ -1,4 +1,4 @@
-const CACHE = "firstbell-v4";
+const CACHE = "firstbell-v5";
 const ASSETS = [
   "/", "/static/index.html", "/static/manifest.json"
 ];
@@ -15,8 +15,24 @@ self.addEventListener("activate", evt => {
     ).then(() => self.clients.claim())
   );
 });
+// The shell is network-first: it names the current content-hashed asset URLs,
+// so a cached copy from before a deploy would request files that are gone.
+// The cached shell is only used offline.  Hashed assets are immutable and
+// left to the HTTP cache.
 self.addEventListener("fetch", evt => {
+  const url = new URL(evt.request.url);
+  const shell = evt.request.mode === "navigate" ||
+    (url.origin === self.location.origin && ASSETS.includes(url.pathname));
+  if (evt.request.method !== "GET" || !shell) return;
   evt.respondWith(
-    caches.match(evt.request).then(r => r || fetch(evt.request))
+    fetch(evt.request).then(r => {
+      if (r.ok) {
+        const copy = r.clone();
+        caches.open(CACHE).then(c => c.put(evt.request, copy));
+      }
+      return r;
+    }).catch(() =>
+      caches.match(evt.request).then(r => r || caches.match("/"))
+    )
   );
 });